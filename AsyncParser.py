@@ -0,0 +1,166 @@
+import asyncio
+from collections import deque
+
+from Parser import NativeBuilder, Parser, TreeBuilder
+from Scanner import Lexer, StreamLexer, TokenType
+
+# One step of Parser.value_steps reads at most this many tokens more than the number of
+# dictionaries and lists open at that point (closing them all, then a comma, a key and
+# a colon); the parser only steps while that many tokens are buffered, so it never
+# runs out of tokens in the middle of a step
+STEP_TOKEN_MARGIN = 8
+
+
+# Parses in a worker, for documents handed off to an executor
+def parse_text(text, builder):
+    parser = Parser.from_lexer(Lexer(text))
+    result = parser.parse(builder)
+    return result, parser.errors
+
+
+# Yields the chunks of an asyncio.StreamReader (anything with an async read(n)) or of
+# an async iterator of bytes or str chunks, split to at most chunk_size each
+async def read_chunks(source, chunk_size):
+    if hasattr(source, 'read'):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            for start in range(0, len(chunk), chunk_size):
+                yield chunk[start:start + chunk_size]
+
+
+# Parses a JSON document as it arrives from an asyncio.StreamReader or an async
+# iterator of chunks, without blocking the event loop for long. Chunks are lexed as
+# they arrive (see StreamLexer), and the parser steps through the tokens with
+# Parser.value_steps, handing control back to the event loop after each chunk and
+# every yield_every tokens.
+#
+# With an executor, a document still unfinished once executor_threshold bytes of it
+# have been read is read to the end and parsed there instead, from the start. Process
+# pools need a picklable builder, and results that can be pickled.
+#
+# Results and errors are exactly those of Parser.parse over the same text.
+class AsyncParser:
+    def __init__(self, builder=None, yield_every=1000, chunk_size=8192,
+                 executor=None, executor_threshold=1 << 20):
+        self.builder = builder
+        self.yield_every = yield_every
+        self.chunk_size = chunk_size
+        self.executor = executor
+        self.executor_threshold = executor_threshold
+        self.errors = []
+
+    # Hands the parser the buffered tokens, tracking how many dictionaries and lists
+    # they leave open; past the last one, the input has ended or failed to lex
+    def buffered_tokens(self):
+        tokens = self.tokens
+        while True:
+            if not tokens:
+                if self.error is not None:
+                    raise self.error
+                if not self.closed:
+                    raise Exception("Internal error: token buffer ran out")
+                return
+            token = tokens.popleft()
+            if token.type == TokenType.LCURLY or token.type == TokenType.LSQUARE:
+                self.depth += 1
+            elif token.type == TokenType.RCURLY or token.type == TokenType.RSQUARE:
+                self.depth -= 1
+            yield token
+
+    async def parse(self, source):
+        builder = self.builder if self.builder is not None else TreeBuilder()
+        self.tokens = deque()
+        self.depth = 0
+        self.closed = False
+        self.error = None
+        stream = StreamLexer()
+        parser = Parser.from_tokens(self.buffered_tokens())
+        parser.builder = builder
+        self.parser = parser
+        self.errors = parser.errors
+        self.steps = self.run(parser)
+        self.next_yield = self.yield_every
+        kept = [] if self.executor is not None else None
+        bytes_read = 0
+
+        chunks = read_chunks(source, self.chunk_size)
+        async for chunk in chunks:
+            bytes_read += len(chunk)
+            if kept is not None:
+                kept.append(chunk)
+                if bytes_read >= self.executor_threshold:
+                    kept.extend([rest async for rest in chunks])
+                    return await self.hand_off(kept, builder)
+            try:
+                self.tokens.extend(stream.feed(chunk))
+            except ValueError as e:
+                # bytes that are not UTF-8; reported once the parser gets this far
+                self.error = e
+            if self.error is None:
+                self.error = stream.error
+            if self.error is not None:
+                break
+            done, result = await self.advance(final=False)
+            if done:
+                return result
+            await asyncio.sleep(0)
+        else:
+            try:
+                self.tokens.extend(stream.close())
+            except ValueError as e:
+                self.error = e
+            if self.error is None:
+                self.error = stream.error
+
+        self.closed = True
+        _, result = await self.advance(final=True)
+        return result
+
+    # Runs parser steps while enough tokens are buffered (or all of them, once the input
+    # is complete), returning (done, result)
+    async def advance(self, final):
+        while final or len(self.tokens) >= self.depth + STEP_TOKEN_MARGIN:
+            try:
+                next(self.steps)
+            except StopIteration as done:
+                return True, done.value
+            if self.parser.index >= self.next_yield:
+                self.next_yield = self.parser.index + self.yield_every
+                await asyncio.sleep(0)
+        return False, None
+
+    # The steps of Parser.parse: reads the first token, then steps through the value
+    def run(self, parser):
+        try:
+            yield
+            parser.get_next_token()
+            return (yield from parser.value_steps())
+        except Exception as e:
+            raise Exception(f"Unexpected error while parsing: {str(e)}")
+
+    async def hand_off(self, chunks, builder):
+        empty = b"" if isinstance(chunks[0], (bytes, bytearray)) else ""
+        text = empty.join(chunks)
+        if isinstance(text, bytes):
+            try:
+                text = text.decode('utf-8')
+            except ValueError as e:
+                raise Exception(f"Unexpected error while parsing: {str(e)}")
+        loop = asyncio.get_running_loop()
+        result, errors = await loop.run_in_executor(self.executor, parse_text, text, builder)
+        self.errors = errors
+        return result
+
+
+# Parses a JSON document from an asyncio.StreamReader or an async iterator of chunks,
+# returning the result and the list of errors like Parser.parse_json. options are
+# passed to AsyncParser.
+async def parse_json_async(source, native=False, **options):
+    parser = AsyncParser(NativeBuilder() if native else None, **options)
+    result = await parser.parse(source)
+    return result, parser.errors
@@ -0,0 +1,248 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from Parser import NativeBuilder, Parser, parse_json
+from Scanner import Lexer, TokenType
+
+
+# Expands file names and glob patterns into a sorted list of distinct paths
+def expand_inputs(patterns):
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in seen and not os.path.isdir(path):
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+# Maps an input path to its output path, keeping the input's directory structure
+def output_path(path, output_dir):
+    relative = os.path.normpath(path).lstrip(os.sep)
+    relative = os.sep.join("__" if part == ".." else part for part in relative.split(os.sep))
+    return os.path.join(output_dir, relative + ".out")
+
+
+# Lexes, parses and validates one file, writing the tree (or the error list) the same
+# way Parser.py does. Runs in a worker process and returns a picklable summary.
+def process_file(path, output_dir=None):
+    result = {"path": path, "output": None, "valid": False, "errors": [], "exception": None,
+              "bytes": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        with open(path, 'r') as input_file:
+            text = input_file.read()
+        result["bytes"] = len(text)
+
+        tree, errors = parse_json(text)
+        result["errors"] = errors
+        result["valid"] = not errors
+
+        if output_dir is not None:
+            output = output_path(path, output_dir)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            with open(output, 'w') as output_file:
+                if errors:
+                    for error in errors:
+                        print(error, file=output_file)
+                else:
+                    tree.print_tree(file=output_file)
+            result["output"] = output
+    except Exception as e:
+        result["exception"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# Processes every path on a pool of worker processes, yielding results in input order.
+# Paths are submitted to the workers chunk_size at a time; workers=1 runs in-process.
+def process_files(paths, output_dir=None, workers=None, chunk_size=16):
+    worker = partial(process_file, output_dir=output_dir)
+    if workers == 1:
+        yield from map(worker, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(worker, paths, chunksize=chunk_size)
+
+
+# Parses one JSON Lines record, which must hold exactly one value: anything after it on
+# the line is an error, not silently dropped
+def parse_record(text, native=True):
+    parser = Parser.from_lexer(Lexer(text))
+    value = parser.parse(NativeBuilder() if native else None)
+    if parser.current_token.type != TokenType.EOF:
+        raise Exception(f"Unexpected token after value: {parser.current_token}")
+    return value, parser.errors
+
+
+# Parses a list of (line number, text) JSON Lines records. Runs in a worker process.
+def parse_records(records, native=True):
+    results = []
+    for line_number, text in records:
+        result = {"line": line_number, "value": None, "errors": [], "exception": None}
+        try:
+            result["value"], result["errors"] = parse_record(text, native=native)
+        except Exception as e:
+            result["exception"] = str(e)
+        results.append(result)
+    return results
+
+
+# Yields (line number, text) for every non-blank line of a JSON Lines file object.
+# Raw newlines are not allowed inside strings, so every line is a complete record.
+def read_records(lines):
+    for line_number, line in enumerate(lines, 1):
+        if line.strip():
+            yield line_number, line
+
+
+# Parses and validates JSON Lines records on a pool of worker processes and yields one
+# result per record, in input order, with its line number, value, error list and any
+# exception. Records are sent to workers chunk_size at a time, and only a bounded
+# window of chunks is in flight, so arbitrarily long inputs are streamed. An executor
+# passed in is used instead of starting a pool, and is left running.
+def parse_json_lines(lines, workers=None, chunk_size=256, native=True, executor=None):
+    records = read_records(lines)
+    worker = partial(parse_records, native=native)
+    if workers == 1 and executor is None:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                return
+            yield from worker(chunk)
+
+    workers = workers or os.cpu_count() or 1
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from stream_chunks(executor, worker, records, chunk_size, 2 * workers)
+    else:
+        yield from stream_chunks(executor, worker, records, chunk_size, 2 * workers)
+
+
+# Submits chunks of records to executor, keeping at most window of them in flight, and
+# yields their results in order
+def stream_chunks(executor, worker, records, chunk_size, window):
+    pending = deque()
+    while True:
+        while len(pending) < window:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            pending.append(executor.submit(worker, chunk))
+        if not pending:
+            return
+        yield from pending.popleft().result()
+
+
+# Validates one JSON Lines file, writing one JSON line per record with its line number
+# and errors. Returns a file result in the same shape as process_file.
+def process_json_lines_file(path, output_dir=None, workers=None, chunk_size=256, executor=None):
+    result = {"path": path, "output": None, "valid": False, "errors": [], "exception": None,
+              "bytes": 0, "seconds": 0.0, "records": 0, "invalid_records": 0}
+    start = time.perf_counter()
+    output_file = None
+    try:
+        if output_dir is not None:
+            result["output"] = output_path(path, output_dir)
+            os.makedirs(os.path.dirname(result["output"]), exist_ok=True)
+            output_file = open(result["output"], 'w')
+
+        with open(path, 'r') as input_file:
+            for record in parse_json_lines(input_file, workers, chunk_size, executor=executor):
+                result["records"] += 1
+                if record["errors"] or record["exception"] is not None:
+                    result["invalid_records"] += 1
+                    result["errors"].extend(f"line {record['line']}: {error}" for error in record["errors"])
+                    if record["exception"] is not None:
+                        result["errors"].append(f"line {record['line']}: {record['exception']}")
+                if output_file is not None:
+                    output_file.write(json.dumps({"line": record["line"], "errors": record["errors"],
+                                                  "exception": record["exception"]}) + "\n")
+            result["bytes"] = input_file.tell()
+        result["valid"] = result["invalid_records"] == 0
+    except Exception as e:
+        result["exception"] = str(e)
+    finally:
+        if output_file is not None:
+            output_file.close()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# Validates JSON Lines files one after another, yielding a result per file like
+# process_json_lines_file. One pool of workers is shared by all of them, so many small
+# files do not each pay for starting workers; workers=1 runs in-process.
+def process_json_lines_files(paths, output_dir=None, workers=None, chunk_size=256):
+    if workers == 1:
+        for path in paths:
+            yield process_json_lines_file(path, output_dir, workers, chunk_size)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path in paths:
+            yield process_json_lines_file(path, output_dir, workers, chunk_size, executor)
+
+
+# Aggregates per-file results into a summary
+def summarize(results, seconds):
+    summary = {
+        "files": len(results),
+        "valid": sum(1 for result in results if result["valid"]),
+        "invalid": sum(1 for result in results if not result["valid"] and result["exception"] is None),
+        "failed": sum(1 for result in results if result["exception"] is not None),
+        "errors": sum(len(result["errors"]) for result in results),
+        "bytes": sum(result["bytes"] for result in results),
+        "seconds": seconds,
+        "results": results,
+    }
+    return summary
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Lex, parse and validate many JSON files in parallel.")
+    argument_parser.add_argument("inputs", nargs="+", help="input files or glob patterns")
+    argument_parser.add_argument("-o", "--output-dir", default="outputs/batch",
+                                 help="directory for per-file trees or error lists")
+    argument_parser.add_argument("-s", "--summary", default=None,
+                                 help="where to write the JSON summary (default: <output-dir>/summary.json)")
+    argument_parser.add_argument("-w", "--workers", type=int, default=None,
+                                 help="worker processes (default: number of CPUs)")
+    argument_parser.add_argument("-c", "--chunk-size", type=int, default=None,
+                                 help="files (or JSON Lines records) submitted to a worker at a time")
+    argument_parser.add_argument("--jsonl", action="store_true",
+                                 help="treat each input as JSON Lines and validate its records in parallel")
+    arguments = argument_parser.parse_args()
+
+    paths = expand_inputs(arguments.inputs)
+    if not paths:
+        sys.exit("No input files matched")
+
+    start = time.perf_counter()
+    if arguments.jsonl:
+        results = list(process_json_lines_files(paths, arguments.output_dir, arguments.workers,
+                                                arguments.chunk_size or 256))
+    else:
+        results = list(process_files(paths, arguments.output_dir, arguments.workers,
+                                     arguments.chunk_size or 16))
+    summary = summarize(results, time.perf_counter() - start)
+
+    summary_path = arguments.summary or os.path.join(arguments.output_dir, "summary.json")
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    try:
+        with open(summary_path, 'w') as summary_file:
+            json.dump(summary, summary_file, indent=2)
+    except Exception as e:
+        raise Exception("Couldn't write summary file")
+
+    print(f"{summary['files']} files: {summary['valid']} valid, {summary['invalid']} invalid, "
+          f"{summary['failed']} failed in {summary['seconds']:.2f} s")
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+from Parser import parse_json
+
+
+# Caches parse results by a SHA-256 hash of the input bytes, so repeated documents skip
+# lexing, parsing and validation entirely. Entries are evicted least recently used
+# first once there are more than max_entries of them, or once the inputs they were
+# parsed from add up to more than max_bytes; inputs larger than max_bytes are never
+# cached. With a directory, entries are also pickled there and survive restarts; entries
+# that cannot be pickled (such as trees nested deeper than the recursion limit) are only
+# kept in memory. The directory keeps at most max_entries files adding up to at most
+# max_disk_bytes, removing the least recently used (by modification time, which hits
+# refresh) first. Files are loaded with pickle, which can run arbitrary code, so the
+# directory must only be writable by those trusted to run code in this process.
+#
+# Cached results are shared between callers and must not be modified.
+class ParseCache:
+    def __init__(self, max_entries=1024, max_bytes=64 << 20, directory=None, max_disk_bytes=256 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = directory
+        self.entries = OrderedDict()  # (digest, native) -> (result, errors, size)
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.disk_files = 0
+        self.disk_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.trim()
+
+    # Returns (result, errors) for text like parse_json from Parser.py, parsing it only if no
+    # result for the same input and output mode is cached
+    def parse_json(self, text, native=False):
+        data = text.encode('utf-8', 'surrogatepass')
+        key = (hashlib.sha256(data).hexdigest(), native)
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            result, errors = parse_json(text, native=native)
+            entry = (result, errors, len(data))
+            if self.put(key, entry):
+                self.store(key, entry)
+        return entry[0], list(entry[1])
+
+    # Looks an entry up in memory, then on disk, counting hits
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.touch(key)
+            return entry
+        entry = self.load(key)
+        if entry is not None:
+            self.put(key, entry)
+            self.hits += 1
+            self.disk_hits += 1
+        return entry
+
+    # Adds an entry to memory, evicting the least recently used ones over the limits.
+    # Returns False, keeping nothing, for an entry over max_bytes on its own.
+    def put(self, key, entry):
+        if entry[2] > self.max_bytes:
+            return False
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        self.entries[key] = entry
+        self.bytes += entry[2]
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted[2]
+            self.evictions += 1
+        return True
+
+    def path(self, key):
+        digest, native = key
+        return os.path.join(self.directory, f"{digest}.{'native' if native else 'tree'}.pickle")
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                entry = pickle.load(cache_file)
+            self.touch(key)
+            return entry
+        except Exception:
+            # a missing, damaged or unreadable file is a miss, and is rewritten
+            return None
+
+    # Marks the file of an entry as recently used, for trim()
+    def touch(self, key):
+        if self.directory is not None:
+            try:
+                os.utime(self.path(key))
+            except OSError:
+                pass
+
+    # Writes an entry to the directory through a temporary file, so readers never see
+    # a partly written one
+    def store(self, key, entry):
+        if self.directory is None:
+            return
+        path = self.path(key)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, 'wb') as cache_file:
+                pickle.dump(entry, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(temporary)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = None
+            os.replace(temporary, path)
+        except (RecursionError, pickle.PicklingError, OSError):
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+        if replaced is None:
+            self.disk_files += 1
+        else:
+            self.disk_bytes -= replaced
+        self.disk_bytes += size
+        if self.disk_files > self.max_entries or self.disk_bytes > self.max_disk_bytes:
+            self.trim()
+
+    # Rescans the directory, removing the least recently used files while it holds more
+    # than max_entries of them or they add up to more than max_disk_bytes. store() keeps
+    # a running count and size in between, and only calls this once a limit is crossed.
+    def trim(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                path = os.path.join(self.directory, name)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                files.append((status.st_mtime, status.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        count = len(files)
+        for _, size, path in files:
+            if count <= self.max_entries and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            count -= 1
+            total -= size
+            self.disk_evictions += 1
+        self.disk_files = count
+        self.disk_bytes = total
+
+    # Drops every entry from memory and, with clear_directory, from disk
+    def clear(self, clear_directory=False):
+        self.entries.clear()
+        self.bytes = 0
+        if clear_directory and self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".pickle"):
+                    os.remove(os.path.join(self.directory, name))
+            self.disk_files = 0
+            self.disk_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+        }
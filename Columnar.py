@@ -0,0 +1,205 @@
+from array import array
+from itertools import accumulate
+
+from Parser import NativeBuilder, Parser
+from Scanner import Lexer
+
+
+# List of booleans packed eight to a byte
+class BoolArray:
+    __slots__ = ('bits', 'length')
+
+    def __init__(self, values=()):
+        self.bits = bytearray()
+        self.length = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value):
+        if not self.length & 7:
+            self.bits.append(0)
+        if value:
+            self.bits[-1] |= 1 << (self.length & 7)
+        self.length += 1
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("BoolArray index out of range")
+        return bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    # Counts the True values without unpacking them
+    def count(self, value=True):
+        true = bin(int.from_bytes(self.bits, 'little')).count('1')
+        return true if value else self.length - true
+
+    def tolist(self):
+        return list(self)
+
+    def __repr__(self):
+        return f"BoolArray({self.tolist()})"
+
+
+# List of strings stored as one buffer with the offset where each string starts
+class StringColumn:
+    __slots__ = ('buffer', 'offsets')
+
+    def __init__(self, strings=()):
+        strings = list(strings)
+        self.buffer = "".join(strings)
+        self.offsets = array('Q', [0])
+        self.offsets.extend(accumulate(map(len, strings)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StringColumn index out of range")
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        buffer = self.buffer
+        offsets = self.offsets
+        for index in range(len(offsets) - 1):
+            yield buffer[offsets[index]:offsets[index + 1]]
+
+    def tolist(self):
+        return list(self)
+
+    def __repr__(self):
+        return f"StringColumn({self.tolist()})"
+
+
+# List of dictionaries with the same keys, stored as one column per key
+class RecordTable:
+    __slots__ = ('keys', 'columns', 'length')
+
+    def __init__(self, keys, columns, length):
+        self.keys = keys
+        self.columns = columns
+        self.length = length
+
+    def column(self, key):
+        return self.columns[self.keys.index(key)]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("RecordTable index out of range")
+        return {key: column[index] for key, column in zip(self.keys, self.columns)}
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self[index]
+
+    def tolist(self):
+        return list(self)
+
+    def __repr__(self):
+        return f"RecordTable({self.keys}, {self.length} records)"
+
+
+# Collects the values of one list, straight into a typed container for as long as they
+# all have the type of the first one, and into a plain list from the first mismatch on
+class ColumnBuffer:
+    __slots__ = ('kind', 'items')
+
+    def __init__(self):
+        self.kind = None
+        self.items = None
+
+    def append(self, value):
+        kind = type(value)
+        if kind is not self.kind:
+            if self.kind is None:
+                self.kind = kind
+                if kind is float:
+                    self.items = array('d')
+                elif kind is bool:
+                    self.items = BoolArray()
+                else:
+                    self.items = []
+            elif self.kind is not list:
+                self.kind = list
+                self.items = list(self.items)
+        self.items.append(value)
+
+    # Returns the finished column: array('d') for numbers, a BoolArray for booleans, a
+    # StringColumn for strings, a RecordTable for dictionaries with the same keys when
+    # records is True, and a plain list otherwise
+    def finish(self, records):
+        if self.kind is None:
+            return []
+        if self.kind is str:
+            return StringColumn(self.items)
+        if self.kind is dict and records:
+            keys = list(self.items[0])
+            if all(len(item) == len(keys) and list(item) == keys for item in self.items):
+                columns = []
+                for key in keys:
+                    column = ColumnBuffer()
+                    for item in self.items:
+                        column.append(item[key])
+                    columns.append(column.finish(records))
+                return RecordTable(keys, columns, len(self.items))
+        return self.items
+
+
+# Builds native values like NativeBuilder, except that lists whose values all have one
+# scalar type are stored as compact typed columns (see ColumnBuffer.finish). With
+# records, lists of dictionaries that have the same keys in the same order are stored
+# column by column as RecordTables.
+class ColumnarBuilder(NativeBuilder):
+    def __init__(self, records=False):
+        self.records = records
+
+    def start_list(self):
+        return ColumnBuffer()
+
+    def append(self, container, value):
+        container.append(value)
+
+    def end_list(self, container):
+        return container.finish(self.records)
+
+
+# Converts columns back into plain lists and dictionaries
+def to_native(value):
+    root = [value]
+    stack = [(root, 0)]
+    while stack:
+        container, key = stack.pop()
+        item = container[key]
+        if isinstance(item, (BoolArray, StringColumn, RecordTable, array)):
+            item = item.tolist()
+        if isinstance(item, list):
+            item = list(item)
+            stack.extend((item, index) for index in range(len(item)))
+        elif isinstance(item, dict):
+            item = dict(item)
+            stack.extend((item, name) for name in item)
+        container[key] = item
+    return root[0]
+
+
+# Lexes and parses a JSON document in memory into columnar values, returning the result
+# and the list of errors
+def parse_columnar(text, records=False):
+    parser = Parser.from_lexer(Lexer(text))
+    result = parser.parse(ColumnarBuilder(records))
+    return result, parser.errors
@@ -0,0 +1,157 @@
+import re
+from collections.abc import Mapping
+from decimal import Decimal
+from math import isfinite
+
+from Parser import Node
+
+# Characters the lexer does not accept inside a string
+UNWRITABLE_PATTERN = re.compile(r'["\n\t\r]')
+
+# Number text the lexer reads back as it is: no exponent, which it does not accept
+POSITIONAL_PATTERN = re.compile(r'[0-9.+\-]+')
+
+# Roughly how many pieces of output are joined into one chunk
+CHUNK_PIECES = 8192
+
+LITERALS = {True: "true", False: "false", None: "null"}
+
+
+def quote(string):
+    if not isinstance(string, str):
+        raise Exception(f"Cannot serialize key {string!r}: keys must be strings")
+    # the lexer reads strings verbatim, without escapes, so they are written verbatim
+    if UNWRITABLE_PATTERN.search(string):
+        raise Exception(f"Cannot serialize string {string!r}: it contains a quote or control character")
+    return f'"{string}"'
+
+
+# Writes a number in positional notation, as the lexer reads numbers without exponents,
+# so that it parses back to the same value (1e-05 as 0.00001). Text that already reads
+# back is kept as it is, so the errors it gives are kept too.
+def number(value):
+    text = value if isinstance(value, str) else repr(value)
+    if POSITIONAL_PATTERN.fullmatch(text):
+        try:
+            float(text)
+            return text
+        except ValueError:
+            pass
+    try:
+        finite = isfinite(float(text))
+    except ValueError:
+        finite = False
+    if not finite:
+        raise Exception(f"Cannot serialize number {value!r}")
+    # the exact digits of the text, only moved around the decimal point
+    return format(Decimal(text), 'f')
+
+
+# Skips the unlabeled nodes the TreeBuilder wraps dictionaries and lists in
+def unwrap(node):
+    while node.label is None and len(node.children) == 1:
+        node = node.children[0]
+    return node
+
+
+# Returns (text, items, is_dict) for a value: the whole text of a scalar with items
+# None, or the opening bracket of a dictionary or list with an iterator over its
+# (key, value) pairs or values
+def describe(value):
+    if value is None or value is True or value is False:
+        return LITERALS[value], None, False
+    if isinstance(value, str):
+        return quote(value), None, False
+    if isinstance(value, float):
+        return number(value), None, False
+    if isinstance(value, int):
+        return str(value), None, False
+    if isinstance(value, Mapping):
+        return "{", iter(value.items()), True
+    if isinstance(value, Node):
+        return describe_node(unwrap(value))
+    try:
+        return "[", iter(value), False
+    except TypeError:
+        raise Exception(f"Cannot serialize {type(value).__name__} value {value!r}")
+
+
+# describe() for the Node tree built by TreeBuilder; strings are written as their labels
+# show them, and numbers as number() writes the text of their labels
+def describe_node(node):
+    label = node.label
+    if label == "Dictionary":
+        return "{", ((unwrap(pair.children[0]).label[5:], pair.children[1]) for pair in node.children), True
+    if label == "List":
+        return "[", iter(node.children), False
+    if label is not None:
+        if label.startswith("String: "):
+            return quote(label[8:]), None, False
+        if label.startswith("Number: "):
+            return number(label[8:]), None, False
+        if label == "Boolean: True":
+            return "true", None, False
+        if label == "Boolean: False":
+            return "false", None, False
+        if label == "Null":
+            return "null", None, False
+    raise Exception(f"Cannot serialize node {label!r}")
+
+
+# Serializes a parse result (a Node tree or native values, including SharedKeyDicts
+# and columnar containers) as JSON without recursion, yielding it in large chunks.
+# indent=None writes compact JSON; an indent writes one value per line.
+def iter_json(value, indent=None):
+    pieces = []
+    append = pieces.append
+    colon = ":" if indent is None else ": "
+    newlines = []
+
+    text, items, is_dict = describe(value)
+    append(text)
+    # each frame is [remaining items, is_dict, depth of the items, no items written yet]
+    frames = [[items, is_dict, 1, True]] if items is not None else []
+    while frames:
+        frame = frames[-1]
+        items, is_dict, depth, first = frame
+        if indent is not None:
+            while len(newlines) <= depth:
+                newlines.append("\n" + " " * (indent * len(newlines)))
+            newline = newlines[depth]
+        for item in items:
+            if first:
+                first = False
+            else:
+                append(",")
+            if indent is not None:
+                append(newline)
+            if is_dict:
+                key, item = item
+                append(quote(key))
+                append(colon)
+            text, child, child_is_dict = describe(item)
+            append(text)
+            if child is not None:
+                frame[3] = False
+                frames.append([child, child_is_dict, depth + 1, True])
+                break
+            if len(pieces) >= CHUNK_PIECES:
+                yield "".join(pieces)
+                pieces.clear()
+        else:
+            frames.pop()
+            if indent is not None and not first:
+                append(newlines[depth - 1])
+            append("}" if is_dict else "]")
+    yield "".join(pieces)
+
+
+# Returns a parse result as a JSON string
+def dumps(value, indent=None):
+    return "".join(iter_json(value, indent))
+
+
+# Writes a parse result to a text file as JSON, one large chunk at a time
+def dump(value, file, indent=None):
+    for chunk in iter_json(value, indent):
+        file.write(chunk)
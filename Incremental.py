@@ -0,0 +1,323 @@
+from bisect import bisect_left, bisect_right
+
+from Parser import Parser, TreeBuilder
+from Scanner import Lexer, LexerError, TokenType
+
+
+# Tokenizes text[start:], recording where each token starts and ends. Stops before the
+# first token starting at or after stop. Raises LexerError (or ValueError for numbers
+# the fast path slices but cannot convert) instead of printing it like tokenize().
+def lex_spans(text, start=0, stop=None):
+    lexer = Lexer(text)
+    lexer.seek(start)
+    whitespace = Lexer.WHITESPACE_PATTERN.match
+    tokens, starts, ends = [], [], []
+    while True:
+        match = whitespace(text, lexer.position)
+        if match is not None:
+            lexer.seek(match.end())
+        if stop is not None and lexer.position >= stop:
+            break
+        token_start = lexer.position
+        token = lexer.get_next_token_fast()
+        if token.type == TokenType.EOF:
+            break
+        tokens.append(token)
+        starts.append(token_start)
+        ends.append(lexer.position)
+    return tokens, starts, ends
+
+
+# One dictionary or list of the document: the token indices of its brackets, the Node
+# that holds it (holder.children[slot] is its node, or holder is None for the root) and
+# the range of the error list its contents reported, errors[first_error:last_error]
+class Span:
+    __slots__ = ('kind', 'open', 'close', 'node', 'holder', 'slot', 'first_error', 'last_error', 'parent')
+
+    def __init__(self, kind, first_error):
+        self.kind = kind
+        self.open = None
+        self.close = None
+        self.node = None
+        self.holder = None
+        self.slot = None
+        self.first_error = first_error
+        self.last_error = None
+        self.parent = None
+
+
+# Builds the same Node tree as TreeBuilder while recording a Span for every dictionary
+# and list, in the order they open
+class SpanBuilder(TreeBuilder):
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = errors
+        self.spans = []
+        self.open_spans = []
+        self.closed = None
+
+    def start_dict(self):
+        self.open_span(TokenType.LCURLY)
+        return super().start_dict()
+
+    def start_list(self):
+        self.open_span(TokenType.LSQUARE)
+        return super().start_list()
+
+    def open_span(self, kind):
+        span = Span(kind, len(self.errors))
+        self.spans.append(span)
+        self.open_spans.append(span)
+
+    def end_dict(self, container):
+        return self.close_span(super().end_dict(container))
+
+    def end_list(self, container):
+        return self.close_span(super().end_list(container))
+
+    def close_span(self, node):
+        span = self.open_spans.pop()
+        span.node = node
+        span.last_error = len(self.errors)
+        self.closed = span
+        return node
+
+    def set_item(self, container, key, value):
+        super().set_item(container, key, value)
+        if self.closed is not None and self.closed.node is value:
+            self.closed.holder = container.children[-1]
+            self.closed.slot = 1
+            self.closed = None
+
+    def append(self, container, value):
+        super().append(container, value)
+        if self.closed is not None and self.closed.node is value:
+            self.closed.holder = container
+            self.closed.slot = len(container.children) - 1
+            self.closed = None
+
+
+# Parses tokens into a Node tree, returning (tree, errors, spans). The spans get their
+# token indices, offset by base, from matching the brackets of the parsed value.
+def parse_spans(tokens, base=0):
+    parser = Parser.from_tokens(tokens)
+    builder = SpanBuilder(parser.errors)
+    tree = parser.parse(builder)
+
+    spans = builder.spans
+    opened = 0
+    stack = []
+    for index, token in enumerate(tokens):
+        if token.type in (TokenType.LCURLY, TokenType.LSQUARE):
+            span = spans[opened]
+            opened += 1
+            span.open = base + index
+            span.parent = stack[-1] if stack else None
+            stack.append(span)
+        elif token.type in (TokenType.RCURLY, TokenType.RSQUARE):
+            stack.pop().close = base + index
+            if not stack:
+                break
+        elif not stack:
+            break
+    return tree, parser.errors, spans
+
+
+# bisect_left over spans[lo:hi] by where they open (bisect only takes a key from
+# Python 3.10 on)
+def bisect_open(spans, token_index, lo, hi):
+    while lo < hi:
+        middle = (lo + hi) // 2
+        if spans[middle].open < token_index:
+            lo = middle + 1
+        else:
+            hi = middle
+    return lo
+
+
+# Checks for an empty dictionary among spans
+def has_empty_dict(spans):
+    return any(span.kind == TokenType.LCURLY and span.close == span.open + 1 for span in spans)
+
+
+# A parsed document that can be edited in place. An edit re-lexes and re-parses only
+# the smallest dictionary or list whose brackets it leaves untouched, splices the new
+# subtree into the Node tree and the new errors into the error list, and keeps the
+# errors reported for everything else. The result always matches a full parse of the
+# edited text; whenever that cannot be guaranteed the whole document is parsed again.
+#
+# Positions after an edit are not rewritten straight away. Tokens from settled_tokens
+# on are stored char_shift characters early, and spans from settled_spans on are stored
+# token_shift tokens and error_shift errors early, so consecutive edits in one place
+# cost nothing for the rest of the document. settle() brings starts, ends and spans up
+# to date.
+class IncrementalDocument:
+    def __init__(self, text):
+        self.full_parses = 0
+        self.incremental_parses = 0
+        self.reparse(text)
+
+    # Lexes and parses the whole text. A lexical or syntax error is kept in self.error,
+    # with no tree, until an edit makes the document parse again.
+    def reparse(self, text):
+        self.text = text
+        self.full_parses += 1
+        self.tokens, self.starts, self.ends = [], [], []
+        self.tree, self.errors, self.spans = None, [], []
+        self.error = None
+        try:
+            self.tokens, self.starts, self.ends = lex_spans(text)
+            self.tree, self.errors, self.spans = parse_spans(self.tokens)
+        except (LexerError, ValueError) as e:
+            self.error = f"Lexical Error: {e}"
+        except Exception as e:
+            self.error = str(e)
+            self.tree, self.errors, self.spans = None, [], []
+        self.settled_tokens, self.char_shift = len(self.tokens), 0
+        self.settled_spans, self.token_shift, self.error_shift = len(self.spans), 0, 0
+
+    # Replaces deleted characters at offset with inserted, returning (tree, errors)
+    def edit(self, offset, deleted, inserted):
+        if not 0 <= offset <= offset + deleted <= len(self.text):
+            raise Exception(f"Edit at {offset} deleting {deleted} characters is outside the document")
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        span = None if self.error is not None else self.enclosing_span(offset, offset + deleted)
+        if span is None or not self.reparse_span(span, text, len(inserted) - deleted):
+            self.reparse(text)
+        return self.tree, self.errors
+
+    # Applies the pending shifts to every token and span
+    def settle(self):
+        self.settle_tokens(len(self.tokens))
+        self.settle_spans(len(self.spans))
+
+    def settle_tokens(self, index):
+        settled = self.settled_tokens
+        if index > settled:
+            shift = self.char_shift
+            self.starts[settled:index] = [position + shift for position in self.starts[settled:index]]
+            self.ends[settled:index] = [position + shift for position in self.ends[settled:index]]
+            self.settled_tokens = index
+        if self.settled_tokens >= len(self.tokens):
+            self.char_shift = 0
+
+    def settle_spans(self, index):
+        if index > self.settled_spans:
+            for span in self.spans[self.settled_spans:index]:
+                span.open += self.token_shift
+                span.close += self.token_shift
+                span.first_error += self.error_shift
+                span.last_error += self.error_shift
+            self.settled_spans = index
+        if self.settled_spans >= len(self.spans):
+            self.token_shift = self.error_shift = 0
+
+    # Bisects starts or ends for a position in the edited text
+    def find_token(self, bisect, positions, position):
+        index = bisect(positions, position, 0, self.settled_tokens)
+        if index == self.settled_tokens:
+            index = bisect(positions, position - self.char_shift, index)
+        return index
+
+    # Finds the index of the first span opening at or after a token index
+    def find_span(self, token_index):
+        index = bisect_open(self.spans, token_index, 0, self.settled_spans)
+        if index == self.settled_spans:
+            index = bisect_open(self.spans, token_index - self.token_shift, index, len(self.spans))
+        return index
+
+    # Finds the smallest dictionary or list that contains every token touching the
+    # edited range [start, end] without either of its brackets touching it
+    def enclosing_span(self, start, end):
+        if not self.tokens or not self.spans:
+            return None
+        first = min(self.find_token(bisect_left, self.ends, start), len(self.tokens) - 1)
+        last = max(self.find_token(bisect_right, self.starts, end) - 1, 0)
+        first, last = min(first, last), max(first, last)
+
+        index = self.find_span(first) - 1
+        if index < 0:
+            return None
+        self.settle_spans(index + 1)
+        span = self.spans[index]
+        while span is not None and span.close <= last:
+            span = span.parent
+        return span
+
+    # Re-lexes and re-parses one span of the edited text, returning False when the
+    # result cannot be spliced in and a full parse is needed instead
+    def reparse_span(self, span, text, delta):
+        after = span.close + 1
+        first_span = self.find_span(span.open)
+        last_span = self.find_span(after)
+        self.settle_tokens(after)
+        self.settle_spans(last_span)
+        # an empty dictionary leaves its key scope open for the rest of the document
+        # (see Parser.value_steps), so key checks after a span holding one, before or
+        # after the edit, cannot be reused. Elsewhere in the document it does no harm:
+        # a span without one opens and closes its own key scopes in balance.
+        if has_empty_dict(self.spans[first_span:last_span]):
+            return False
+
+        start = self.starts[span.open]
+        stop = self.ends[span.close] + delta
+        try:
+            tokens, starts, ends = lex_spans(text, start, stop)
+            if not tokens or ends[-1] != stop:
+                return False
+            tree, errors, spans = parse_spans(tokens, span.open)
+        except Exception:
+            return False
+        # the brackets must still match each other, with no tokens left over
+        if not spans or spans[0].close != span.open + len(tokens) - 1 or spans[0].kind != span.kind:
+            return False
+        if has_empty_dict(spans):
+            return False
+
+        # splices the tokens; later tokens become pending, char_shift characters early
+        token_delta = len(tokens) - (after - span.open)
+        if self.char_shift:
+            for positions in (self.starts, self.ends):
+                positions[after:self.settled_tokens] = [position - self.char_shift for position
+                                                        in positions[after:self.settled_tokens]]
+        self.tokens[span.open:after] = tokens
+        self.starts[span.open:after] = starts
+        self.ends[span.open:after] = ends
+        self.settled_tokens = span.open + len(tokens)
+        self.char_shift += delta
+
+        # splices the errors in place of those the old span reported
+        error_delta = len(errors) - (span.last_error - span.first_error)
+        self.errors[span.first_error:span.last_error] = errors
+        for other in spans:
+            other.first_error += span.first_error
+            other.last_error += span.first_error
+
+        # splices the subtree into the tree and its spans into the span list; later
+        # spans become pending like the tokens
+        root = spans[0]
+        root.holder, root.slot, root.parent = span.holder, span.slot, span.parent
+        if span.holder is None:
+            self.tree = tree
+        else:
+            span.holder.children[span.slot] = tree
+        if self.token_shift or self.error_shift:
+            for other in self.spans[last_span:self.settled_spans]:
+                other.open -= self.token_shift
+                other.close -= self.token_shift
+                other.first_error -= self.error_shift
+                other.last_error -= self.error_shift
+        self.spans[first_span:last_span] = spans
+        self.settled_spans = first_span + len(spans)
+        self.token_shift += token_delta
+        self.error_shift += error_delta
+
+        ancestor = span.parent
+        while ancestor is not None:
+            ancestor.close += token_delta
+            ancestor.last_error += error_delta
+            ancestor = ancestor.parent
+
+        self.text = text
+        self.incremental_parses += 1
+        return True
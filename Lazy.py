@@ -0,0 +1,249 @@
+import re
+from array import array
+from bisect import bisect_left
+
+from Parser import NativeBuilder, Parser
+from Scanner import Lexer, TokenFlag, TokenType
+
+# Skips everything up to the next bracket, stepping over whole strings, and captures
+# the bracket, a quote that does not start a valid string, or nothing at the end
+STRUCTURE_PATTERN = re.compile(r'[^"\[\]{}]*(?:"[^"\n\t\r]*"[^"\[\]{}]*)*([\[\]{}"]?)')
+
+BRACKET_PAIRS = {'{': '}', '[': ']'}
+
+
+# Finds every dictionary and list in the one starting at text[position] without
+# tokenizing it, returning the offsets of their opening brackets, in order, and of the
+# matching closing brackets
+def build_index(text, position):
+    opens = array('q')
+    closes = array('q')
+    stack = []
+    scan = STRUCTURE_PATTERN.match
+    while True:
+        match = scan(text, position)
+        bracket = match.group(1)
+        if not bracket:
+            break
+        offset = match.end() - 1
+        if bracket == '"':
+            # reports an unterminated string or a control character in one exactly as
+            # the lexer does
+            lexer = Lexer(text)
+            lexer.seek(offset)
+            lexer.get_next_token_fast()
+        if bracket in BRACKET_PAIRS:
+            stack.append(len(opens))
+            opens.append(offset)
+            closes.append(-1)
+        else:
+            if not stack or BRACKET_PAIRS[text[opens[stack[-1]]]] != bracket:
+                raise Exception(f"Unexpected '{bracket}' at position {offset}")
+            closes[stack.pop()] = offset
+            if not stack:
+                break
+        position = match.end()
+    if stack:
+        raise Exception(f"Unclosed '{text[opens[stack[-1]]]}' at position {opens[stack[-1]]}")
+    return opens, closes
+
+
+# A JSON document whose dictionaries and lists are only parsed when they are accessed.
+# Opening it finds the brackets of every dictionary and list (see build_index); root
+# is then a LazyNode, or the value itself for a scalar document.
+#
+# Each LazyNode runs the validators for its own keys and values when it is first
+# accessed, adding the errors to its errors and to the document's. Duplicate keys are
+# checked within each dictionary. validate_all() parses the whole document and returns
+# exactly the errors the parser reports.
+class LazyDocument:
+    def __init__(self, text):
+        self.text = text
+        self.lexer = Lexer(text)
+        self.errors = []
+        self.all_errors = None
+
+        match = Lexer.WHITESPACE_PATTERN.match(text)
+        start = match.end() if match is not None else 0
+        if text[start:start + 1] in BRACKET_PAIRS:
+            self.opens, self.closes = build_index(text, start)
+        else:
+            self.opens, self.closes = array('q'), array('q')
+
+        validator = self.validator([])
+        self.root, _ = self.read_value(validator)
+        self.errors.extend(validator.errors)
+        # like the parser, reads one token past the value, which must at least lex
+        self.lexer.get_next_token_fast()
+
+    # A parser used only for its validate_* methods, reporting into errors
+    @staticmethod
+    def validator(errors):
+        validator = Parser(())
+        validator.errors = errors
+        validator.dict_stack = [set()]
+        return validator
+
+    def close_of(self, offset):
+        return self.closes[bisect_left(self.opens, offset)]
+
+    # Reads the value at the lexer's position, returning it with its token type. Scalars
+    # are validated and returned as native values; dictionaries and lists are skipped
+    # and returned as LazyNodes.
+    def read_value(self, validator):
+        text = self.text
+        lexer = self.lexer
+        match = Lexer.WHITESPACE_PATTERN.match(text, lexer.position)
+        position = match.end() if match is not None else lexer.position
+        char = text[position] if position < len(text) else None
+
+        if char in BRACKET_PAIRS:
+            close = self.close_of(position)
+            lexer.seek(close + 1)
+            if char == '{':
+                return LazyNode(self, position, close, True), TokenType.LCURLY
+            return LazyNode(self, position, close, False), TokenType.LSQUARE
+
+        lexer.seek(position)
+        token = lexer.get_next_token_fast()
+        if token.type == TokenType.STRING:
+            if token.flags is None or token.flags & TokenFlag.RESERVED:
+                validator.validate_reserved_strings(token.value)
+            return token.value, token.type
+        if token.type == TokenType.NUMBER:
+            if token.flags != 0:
+                validator.validate_decimal_number(str(token.value))
+                validator.validate_number_format(str(token.value))
+            return token.value, token.type
+        if token.type == TokenType.BOOLEAN:
+            return token.value, token.type
+        if token.type == TokenType.NULL:
+            return None, token.type
+        raise Exception(f"Unexpected token in value: {token}")
+
+    # Parses and validates the whole document, returning the same errors the parser does
+    def validate_all(self):
+        if self.all_errors is None:
+            self.all_errors = Parser.from_lexer(Lexer(self.text)).validate()
+        return self.all_errors
+
+
+# A dictionary or list of a LazyDocument, spanning text[start:end + 1]. Its keys and
+# values are read on first access; nested dictionaries and lists are LazyNodes again.
+class LazyNode:
+    __slots__ = ('document', 'start', 'end', 'is_dict', 'entries', 'errors')
+
+    def __init__(self, document, start, end, is_dict):
+        self.document = document
+        self.start = start
+        self.end = end
+        self.is_dict = is_dict
+        self.entries = None
+        self.errors = None
+
+    # Reads and validates the keys and values directly inside this node
+    def load(self):
+        if self.entries is not None:
+            return self.entries
+        document = self.document
+        lexer = document.lexer
+        errors = []
+        validator = document.validator(errors)
+        lexer.seek(self.start + 1)
+
+        if self.is_dict:
+            entries = {}
+            closing = TokenType.RCURLY
+        else:
+            entries = []
+            closing = TokenType.RSQUARE
+            first_type = None
+
+        if self.is_dict:
+            token = lexer.get_next_token_fast()
+        else:
+            # a list's first token is read as part of its first value
+            match = Lexer.WHITESPACE_PATTERN.match(document.text, lexer.position)
+            empty = document.text[match.end() if match is not None else lexer.position] == ']'
+            token = lexer.get_next_token_fast() if empty else None
+        if token is None or token.type != closing:
+            while True:
+                if self.is_dict:
+                    if token.type != TokenType.STRING:
+                        raise Exception(f"Expected string key in pair, got {token.type}")
+                    key = token.value
+                    if token.flags != 0:
+                        validator.validate_empty_key(key)
+                        validator.validate_reserved_key(key)
+                    validator.validate_duplicate_keys(key)
+                    token = lexer.get_next_token_fast()
+                    if token.type != TokenType.COLON:
+                        raise Exception(f"Expected token {TokenType.COLON}, got {token.type}")
+                    entries[key], _ = document.read_value(validator)
+                else:
+                    mark = len(errors)
+                    value, value_type = document.read_value(validator)
+                    entries.append(value)
+                    if first_type is None:
+                        first_type = value_type
+                    elif value_type != first_type and not validator.validate_list_types(first_type, value_type):
+                        # the parser reports the type before the value's own errors
+                        errors.insert(mark, errors.pop())
+
+                token = lexer.get_next_token_fast()
+                if token.type != TokenType.COMMA:
+                    break
+                if self.is_dict:
+                    token = lexer.get_next_token_fast()
+        if token.type != closing:
+            raise Exception(f"Expected token {closing}, got {token.type}")
+
+        self.errors = errors
+        document.errors.extend(errors)
+        self.entries = entries
+        return entries
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __len__(self):
+        return len(self.load())
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __contains__(self, key):
+        return key in self.load()
+
+    def get(self, key, default=None):
+        entries = self.load()
+        return entries.get(key, default) if self.is_dict else default
+
+    def keys(self):
+        if not self.is_dict:
+            raise Exception("keys() requires a dictionary node")
+        return self.load().keys()
+
+    def values(self):
+        return self.load().values() if self.is_dict else iter(self.load())
+
+    def items(self):
+        if not self.is_dict:
+            raise Exception("items() requires a dictionary node")
+        return self.load().items()
+
+    # Parses this whole subtree into native values at once
+    def to_native(self):
+        lexer = Lexer(self.document.text, self.document.lexer.intern_table)
+        lexer.seek(self.start)
+        end = self.end
+
+        def tokens():
+            while lexer.position <= end:
+                yield lexer.get_next_token_fast()
+
+        return Parser.from_tokens(tokens()).parse(NativeBuilder())
+
+    def __repr__(self):
+        kind = "dict" if self.is_dict else "list"
+        return f"LazyNode({kind} at {self.start}-{self.end})"
@@ -1,87 +1,426 @@
-# Defines token types to be returned to the class Token
-class TokenType:
-    LCURLY = 'LCURLY'  # '{'
-    RCURLY = 'RCURLY'  # '}'
-    LSQUARE = 'LSQUARE'  # '['
-    RSQUARE = 'RSQUARE'  # ']'
-    COMMA = 'COMMA'  # ','
-    COLON = 'COLON'  # ':'
-    STRING = 'STRING'  # Strings
-    NUMBER = 'NUMBER'  # Numeric values
-    BOOLEAN = 'BOOLEAN'  # True or False
-    NULL = 'NULL'  # Null values
-    EOF = 'EOF'  # End of input
-
-
-# Creates Tokens based off the TokenType class when given the type and optional value parameter
-class Token:
-    def __init__(self, type_, value=None):
-        self.type = type_
-        self.value = value
+import mmap
+import os
+import re
+import struct
+import sys
+from collections.abc import Mapping
 
-    def __repr__(self):
-        if self.type == TokenType.STRING:
-            return f"<str, {self.value}>"
-        elif self.type == TokenType.NUMBER:
-            return f"<num, {self.value}>"
-        elif self.type == TokenType.BOOLEAN:
-            return f"<bool, {self.value}>"
-        elif self.type == TokenType.LCURLY:
-            return "<{>"
-        elif self.type == TokenType.RCURLY:
-            return "<}>"
-        elif self.type == TokenType.LSQUARE:
-            return "<[>"
-        elif self.type == TokenType.RSQUARE:
-            return "<]>"
-        elif self.type == TokenType.COMMA:
-            return "<,>"
-        elif self.type == TokenType.COLON:
-            return "<:>"
+from Scanner import (COLON_TOKEN, COMMA_TOKEN, EOF_TOKEN, FALSE_TOKEN, LCURLY_TOKEN, LSQUARE_TOKEN, NULL_TOKEN,
+                     RCURLY_TOKEN, RESERVED_WORDS, RSQUARE_TOKEN, TRUE_TOKEN, InternTable, Lexer, Token,
+                     TokenFlag, TokenTag, TokenType, number_flags, string_flags)
+
+
+# The lexer's shared tokens for punctuation and keywords, keyed by their text form
+SIMPLE_TOKENS = {
+    "<{>": LCURLY_TOKEN,
+    "<}>": RCURLY_TOKEN,
+    "<[>": LSQUARE_TOKEN,
+    "<]>": RSQUARE_TOKEN,
+    "<:>": COLON_TOKEN,
+    "<,>": COMMA_TOKEN,
+    "<bool, True>": TRUE_TOKEN,
+    "<bool, False>": FALSE_TOKEN,
+    "<null>": NULL_TOKEN,
+}
+
+# Shared labels for boolean leaves, and the most key labels a parser will reuse
+BOOLEAN_LABELS = {True: "Boolean: True", False: "Boolean: False"}
+KEY_LABEL_CACHE_SIZE = 4096
+KEY_LAYOUT_CACHE_SIZE = 4096
+
+# How many lines print_tree collects before writing them out in one call
+PRINT_CHUNK_LINES = 4096
+
+
+# Token types that open and close dictionaries and lists, and scalar value types
+OPENING_TYPES = frozenset((TokenType.LCURLY, TokenType.LSQUARE))
+CLOSING_TYPES = frozenset((TokenType.RCURLY, TokenType.RSQUARE))
+SCALAR_TYPES = frozenset((TokenType.STRING, TokenType.NUMBER, TokenType.BOOLEAN, TokenType.NULL))
+
+# One step of a selection path: .name, ["name"], [index], .* or [*]
+PATH_STEP_PATTERN = re.compile(r'\.([^.\[\]]+)|\["([^"]*)"\]|\[(\d+)\]|\[\*\]')
+
+
+# Compiles a path such as $.tasks[*].title into a tuple of steps: a key string, a list
+# index, or None for a wildcard that matches every key or index
+def parse_path(path):
+    if not path.startswith('$'):
+        raise Exception(f"Invalid path {path}: paths start with $")
+    steps = []
+    position = 1
+    while position < len(path):
+        match = PATH_STEP_PATTERN.match(path, position)
+        if match is None:
+            raise Exception(f"Invalid path {path} at position {position}")
+        name, quoted, index = match.groups()
+        if name is not None:
+            steps.append(None if name == '*' else name)
+        elif quoted is not None:
+            steps.append(quoted)
+        elif index is not None:
+            steps.append(int(index))
         else:
-            return f"<{self.type}>"
+            steps.append(None)
+        position = match.end()
+    return tuple(steps)
+
+
+# Follows path steps through an already built native value
+def select_values(value, steps):
+    current = [value]
+    for step in steps:
+        selected = []
+        for item in current:
+            if isinstance(item, dict):
+                if step is None:
+                    selected.extend(item.values())
+                elif isinstance(step, str) and step in item:
+                    selected.append(item[step])
+            elif isinstance(item, list):
+                if step is None:
+                    selected.extend(item)
+                elif isinstance(step, int) and step < len(item):
+                    selected.append(item[step])
+        current = selected
+    return current
 
 
 # Defines nodes in a tree
 class Node:
+    __slots__ = ('label', 'branch_length', 'children', 'is_leaf')
+
     def __init__(self, label=None, branch_length=None, is_leaf=False):
         self.label = label
         self.branch_length = branch_length
-        self.children = []
+        self.children = ()  # leaves never allocate a child list
         self.is_leaf = is_leaf
 
     def add_child(self, child):
-        self.children.append(child)
+        if self.children:
+            self.children.append(child)
+        else:
+            self.children = [child]
 
+    # Prints the tree without recursion, so any depth works, joining lines into large
+    # chunks instead of printing them one at a time
     def print_tree(self, depth=-1, file=None):
-        indent = "  " * depth
-        if self.is_leaf:
-            print(f"{indent}{self.label}", file=file)
-        else:
-            if self.label:
-                label = self.label
-                print(f"{indent}{label}", file=file)
-            for child in self.children:
-                child.print_tree(depth + 1, file=file)
-        if self.branch_length is not None:
-            print(f"{indent}{self.branch_length}", file=file)
+        if file is None:
+            file = sys.stdout
+        lines = []
+        append = lines.append
+        # each frame is (remaining children, their depth, their parent)
+        frames = [(iter((self,)), depth, None)]
+        while frames:
+            children, depth, parent = frames[-1]
+            indent = "  " * depth
+            for node in children:
+                if node.is_leaf:
+                    append(f"{indent}{node.label}")
+                else:
+                    if node.label:
+                        append(f"{indent}{node.label}")
+                    if node.children:
+                        frames.append((iter(node.children), depth + 1, node))
+                        break
+                if node.branch_length is not None:
+                    append(f"{indent}{node.branch_length}")
+                if len(lines) >= PRINT_CHUNK_LINES:
+                    append("")
+                    file.write("\n".join(lines))
+                    lines.clear()
+            else:
+                # all of parent's children are printed; its branch length comes last
+                frames.pop()
+                if parent is not None and parent.branch_length is not None:
+                    append(f"{'  ' * (depth - 1)}{parent.branch_length}")
+        if lines:
+            append("")
+            file.write("\n".join(lines))
+
+
+# Builds the Node tree printed by print_tree as the parser recognizes values
+class TreeBuilder:
+    def __init__(self):
+        self.key_labels = {}
+
+    def string(self, value):
+        return Node(label=f"String: {value}")
+
+    def number(self, value):
+        return Node(label=f"Number: {value}")
+
+    def boolean(self, value):
+        return Node(label=BOOLEAN_LABELS[value])
+
+    def null(self):
+        return Node(label="Null", is_leaf=True)
+
+    def start_dict(self):
+        return Node(label="Dictionary")
+
+    def key(self, container, key):
+        pass
+
+    def set_item(self, container, key, value):
+        # keys repeat across records, so their labels are shared
+        label = self.key_labels.get(key)
+        if label is None:
+            label = f"Key: {key}"
+            if len(self.key_labels) < KEY_LABEL_CACHE_SIZE:
+                self.key_labels[key] = label
+        pair = Node(label="Pair")
+        pair.add_child(Node(label=label))
+        pair.add_child(value)
+        container.add_child(pair)
+
+    def end_dict(self, container):
+        node = Node()
+        node.add_child(container)
+        return node
+
+    def start_list(self):
+        return Node(label="List")
+
+    def append(self, container, value):
+        container.add_child(value)
+
+    def end_list(self, container):
+        node = Node()
+        node.add_child(container)
+        return node
+
+
+# Builds plain dict, list, str, float, bool and None values instead of a Node tree
+class NativeBuilder:
+    def string(self, value):
+        return value
+
+    def number(self, value):
+        try:
+            return float(value)
+        except ValueError:
+            # malformed numbers from a token file were already reported by the validators
+            return value
+
+    def boolean(self, value):
+        return value
+
+    def null(self):
+        return None
+
+    def start_dict(self):
+        return {}
+
+    def key(self, container, key):
+        pass
+
+    def set_item(self, container, key, value):
+        container[key] = value
+
+    def end_dict(self, container):
+        return container
+
+    def start_list(self):
+        return []
+
+    def append(self, container, value):
+        container.append(value)
+
+    def end_list(self, container):
+        return container
+
+
+# The keys of a dictionary, in order, and the position of each key's value
+class KeyLayout:
+    __slots__ = ('keys', 'index')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {key: position for position, key in enumerate(keys)}
+
+
+# Read-only mapping for a dictionary whose keys follow a shared KeyLayout. Only the
+# values are stored per dictionary, so records with the same keys share one layout.
+class SharedKeyDict(Mapping):
+    __slots__ = ('layout', 'row')
+
+    def __init__(self, layout, row):
+        self.layout = layout
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.row[self.layout.index[key]]
+
+    def __iter__(self):
+        return iter(self.layout.keys)
+
+    def __len__(self):
+        return len(self.row)
+
+    def __repr__(self):
+        return repr(dict(zip(self.layout.keys, self.row)))
+
+
+# Builds native values like NativeBuilder, except that dictionaries are SharedKeyDicts
+# sharing one KeyLayout per distinct key sequence. Dictionaries with duplicate keys,
+# and any beyond KEY_LAYOUT_CACHE_SIZE distinct layouts, are plain dicts.
+class SharedKeyBuilder(NativeBuilder):
+    def __init__(self):
+        self.layouts = {}
+
+    def start_dict(self):
+        return ([], [])
+
+    def set_item(self, container, key, value):
+        container[0].append(key)
+        container[1].append(value)
+
+    def end_dict(self, container):
+        keys = tuple(container[0])
+        layout = self.layouts.get(keys)
+        if layout is None:
+            layout = KeyLayout(keys)
+            if len(layout.index) != len(keys) or len(self.layouts) >= KEY_LAYOUT_CACHE_SIZE:
+                return dict(zip(keys, container[1]))
+            self.layouts[keys] = layout
+        return SharedKeyDict(layout, tuple(container[1]))
+
+
+# Builds nothing at all, for validating a document without keeping any of it
+class NullBuilder:
+    def string(self, value):
+        return None
+
+    def number(self, value):
+        return None
+
+    def boolean(self, value):
+        return None
+
+    def null(self):
+        return None
+
+    def start_dict(self):
+        return None
+
+    def key(self, container, key):
+        pass
+
+    def set_item(self, container, key, value):
+        pass
+
+    def end_dict(self, container):
+        return None
+
+    def start_list(self):
+        return None
+
+    def append(self, container, value):
+        pass
+
+    def end_list(self, container):
+        return None
+
+
+# Turns recognized values into (event, value) tuples instead of building anything:
+# start_object, key, end_object, start_array, end_array and value, with an error event
+# placed before the event that follows the validation that reported it
+class EventBuilder:
+    def __init__(self, errors):
+        self.errors = errors
+        self.reported = 0
+        self.events = []
+
+    def emit(self, event, value=None):
+        while self.reported < len(self.errors):
+            self.events.append(("error", self.errors[self.reported]))
+            self.reported += 1
+        self.events.append((event, value))
+
+    # reports errors that no later event has picked up
+    def flush(self):
+        self.emit(None)
+        self.events.pop()
+
+    def string(self, value):
+        self.emit("value", value)
+
+    def number(self, value):
+        self.emit("value", NativeBuilder.number(self, value))
+
+    def boolean(self, value):
+        self.emit("value", value)
+
+    def null(self):
+        self.emit("value", None)
+
+    def start_dict(self):
+        self.emit("start_object")
+
+    def key(self, container, key):
+        self.emit("key", key)
+
+    def set_item(self, container, key, value):
+        pass
+
+    def end_dict(self, container):
+        self.emit("end_object")
+
+    def start_list(self):
+        self.emit("start_array")
+
+    def append(self, container, value):
+        pass
+
+    def end_list(self, container):
+        self.emit("end_array")
 
 
 # Defines the parser used to iterate over the input file
 class Parser:
     def __init__(self, lexer):
         self.lexer = iter(lexer)
+        self.tokens = None
         self.current_token = Token(None)
         self.end_of_input = False
         self.index = 0
         self.errors = []
         self.dict_stack = []
+        self.builder = TreeBuilder()
+        self.key_table = InternTable()
+
+    # Creates a parser over Token objects instead of lines of the tokenized text format
+    @classmethod
+    def from_tokens(cls, tokens):
+        parser = cls(())
+        parser.tokens = iter(tokens)
+        return parser
+
+    # Creates a parser fed directly by a Lexer, with no intermediate token file
+    @classmethod
+    def from_lexer(cls, lexer):
+        return cls.from_tokens(lexer)
+
+    # Takes the next Token object when parsing from tokens instead of text
+    def get_next_object_token(self):
+        try:
+            token = next(self.tokens)
+        except StopIteration:
+            self.current_token = EOF_TOKEN
+            self.end_of_input = True
+            return self.current_token
+
+        self.index += 1
+        self.current_token = token
+        return self.current_token
 
     # Converts a string into a token if its a valid token
     def get_next_token(self):
         if self.end_of_input:
-            self.current_token = Token(TokenType.EOF)
+            self.current_token = EOF_TOKEN
             return self.current_token
+        if self.tokens is not None:
+            return self.get_next_object_token()
         try:
             token = next(self.lexer).strip()
             self.index += 1
@@ -91,18 +430,9 @@ class Parser:
                 token = next(self.lexer).strip()
                 self.index += 1
 
-            if token == "<{>":
-                self.current_token = Token(TokenType.LCURLY)
-            elif token == "<}>":
-                self.current_token = Token(TokenType.RCURLY)
-            elif token == "<[>":
-                self.current_token = Token(TokenType.LSQUARE)
-            elif token == "<]>":
-                self.current_token = Token(TokenType.RSQUARE)
-            elif token == "<:>":
-                self.current_token = Token(TokenType.COLON)
-            elif token == "<,>":
-                self.current_token = Token(TokenType.COMMA)
+            simple_token = SIMPLE_TOKENS.get(token)
+            if simple_token is not None:
+                self.current_token = simple_token
             elif token.startswith("<str, "):
                 # takes rest of token as value
                 val = token[6:-1]
@@ -111,18 +441,12 @@ class Parser:
                 # takes rest of token as value
                 val = token[6:-1]
                 self.current_token = Token(TokenType.NUMBER, val)
-            elif token == ("<bool, True>"):
-                self.current_token = Token(TokenType.BOOLEAN, True)
-            elif token == ("<bool, False>"):
-                self.current_token = Token(TokenType.BOOLEAN, False)
-            elif token == ("<null>"):
-                self.current_token = Token(TokenType.NULL)
             else:
                 raise Exception(f"Invalid token format at line {self.index}: {token}")
 
         # hits end of file
         except StopIteration:
-            self.current_token = Token(TokenType.EOF)
+            self.current_token = EOF_TOKEN
             self.end_of_input = True
         except Exception as e:
             raise Exception(f"Error processing token at line {self.index}: {str(e)}")
@@ -139,123 +463,336 @@ class Parser:
             raise Exception(f"Expected token {token_type}, got {self.current_token.type} "
                             f"at line {self.index}")
 
-    # starts recursive descent parsing
-    def parse(self):
+    # starts parsing; the builder decides what values are built from
+    # (a Node tree by default, or plain Python objects with NativeBuilder)
+    def parse(self, builder=None):
+        if builder is not None:
+            self.builder = builder
         try:
             self.get_next_token()
             return self.value()
         except Exception as e:
             raise Exception(f"Unexpected error while parsing: {str(e)}")
 
-    # parses dictionaries
-    def dict(self):
-        self.eat(TokenType.LCURLY)
-        self.dict_stack.append(set())
-
-        node = Node(label="Dictionary")
+    # Checks the document without building anything, returning the list of errors. With
+    # max_errors, stops reading as soon as that many errors were found and returns
+    # only the first max_errors of them, which are the first ones a full parse reports.
+    # Syntax errors are raised as they are by parse(), unless reading stopped earlier.
+    # max_errors below 1 raises ValueError, as it could only report an empty list.
+    def validate(self, max_errors=None):
+        if max_errors is not None and max_errors < 1:
+            raise ValueError(f"max_errors must be at least 1, not {max_errors}")
+        self.builder = NullBuilder()
+        try:
+            self.get_next_token()
+            for _ in self.value_steps():
+                if max_errors is not None and len(self.errors) >= max_errors:
+                    break
+        except Exception as e:
+            raise Exception(f"Unexpected error while parsing: {str(e)}")
+        if max_errors is not None:
+            del self.errors[max_errors:]
+        return self.errors
 
-        # checks for an empty dictionary
-        if self.current_token.type == TokenType.RCURLY:
-            self.eat(TokenType.RCURLY)
-            return node
+    # Parses a stream of consecutive top-level values (for example JSON Lines), yielding
+    # (result, errors) for each one. Each value gets its own error list and key scopes.
+    def parse_documents(self, builder=None):
+        if builder is not None:
+            self.builder = builder
+        try:
+            self.get_next_token()
+            while self.current_token.type != TokenType.EOF:
+                self.errors = []
+                self.dict_stack = []
+                result = self.value()
+                yield result, self.errors
+        except Exception as e:
+            raise Exception(f"Unexpected error while parsing: {str(e)}")
 
-        pair_node = self.pair()
-        node.add_child(pair_node)
+    # Parses incrementally, yielding (event, value) tuples as tokens arrive instead of
+    # building a tree. Validation errors are yielded as ("error", message) events. No
+    # values are kept once reported, but the keys of every open dictionary are kept for
+    # the duplicate key check, and self.errors still collects every error.
+    def iter_events(self):
+        builder = EventBuilder(self.errors)
+        self.builder = builder
+        try:
+            self.get_next_token()
+            steps = self.value_steps()
+            done = False
+            while not done:
+                try:
+                    next(steps)
+                except StopIteration:
+                    done = True
+                events = builder.events
+                builder.events = []
+                yield from events
+            builder.flush()
+        except Exception as e:
+            raise Exception(f"Unexpected error while parsing: {str(e)}")
+        yield from builder.events
+        builder.events = []
 
-        # iterates through the dictionary
-        while self.current_token.type == TokenType.COMMA:
-            self.eat(TokenType.COMMA)
-            pair_node = self.pair()
-            node.add_child(pair_node)
+    # Extracts the values at the given paths (see parse_path), returning a dict from each
+    # path to the list of values it matched. Only matching values are built, as native
+    # objects and with their validation checks; everything else is skipped by counting
+    # brackets, without building or validating it.
+    def extract(self, paths):
+        paths = list(paths)
+        compiled = [parse_path(path) for path in paths]
+        results = {path: [] for path in paths}
+        self.builder = NativeBuilder()
 
-        self.eat(TokenType.RCURLY)
-        self.dict_stack.pop()
-        return node
+        # an active state (i, n) means path i has matched its first n steps so far
+        def child_states(states, step):
+            return [(i, n + 1) for i, n in states
+                    if n < len(compiled[i]) and (compiled[i][n] is None or compiled[i][n] == step
+                                                 and type(compiled[i][n]) is type(step))]
 
-    # parses pairs
-    def pair(self):
-        if self.current_token.type != TokenType.STRING:
-            raise Exception(f"Expected string key in pair, got {self.current_token.type}")
+        try:
+            self.get_next_token()
+            stack = []
+            states = [(i, 0) for i in range(len(compiled))]
 
-        node = Node(label="Pair")
+            while True:
+                # --- a value starts at the current token ---
+                token_type = self.current_token.type
+                matched = [i for i, n in states if n == len(compiled[i])]
+                if matched:
+                    value = self.value()
+                    for i in matched:
+                        results[paths[i]].append(value)
+                    # longer paths continue inside the value that was just built
+                    for i, n in states:
+                        if n < len(compiled[i]):
+                            results[paths[i]].extend(select_values(value, compiled[i][n:]))
+                elif not states or token_type not in OPENING_TYPES:
+                    self.skip_value()
+                elif token_type == TokenType.LCURLY:
+                    self.eat(TokenType.LCURLY)
+                    if self.current_token.type == TokenType.RCURLY:
+                        self.eat(TokenType.RCURLY)
+                    else:
+                        stack.append([True, states, None])
+                        states = child_states(states, self.skip_key())
+                        continue
+                else:
+                    self.eat(TokenType.LSQUARE)
+                    if self.current_token.type == TokenType.RSQUARE:
+                        self.eat(TokenType.RSQUARE)
+                    else:
+                        stack.append([False, states, 0])
+                        states = child_states(states, 0)
+                        continue
 
-        self.validate_empty_key(self.current_token.value)
-        self.validate_reserved_key(self.current_token.value)
-        self.validate_duplicate_keys(self.current_token.value)
+                # --- the value is complete: move on to the next key or list index ---
+                while stack:
+                    frame = stack[-1]
+                    if self.current_token.type == TokenType.COMMA:
+                        self.eat(TokenType.COMMA)
+                        if frame[0]:
+                            states = child_states(frame[1], self.skip_key())
+                        else:
+                            frame[2] += 1
+                            states = child_states(frame[1], frame[2])
+                        break
+                    self.eat(TokenType.RCURLY if frame[0] else TokenType.RSQUARE)
+                    stack.pop()
+                else:
+                    return results
+        except Exception as e:
+            raise Exception(f"Unexpected error while parsing: {str(e)}")
 
+    # reads the key and colon of a pair without validating the key
+    def skip_key(self):
+        if self.current_token.type != TokenType.STRING:
+            raise Exception(f"Expected string key in pair, got {self.current_token.type}")
         key = self.current_token.value
         self.eat(TokenType.STRING)
         self.eat(TokenType.COLON)
+        return key
 
-        node.add_child(Node(label=f"Key: {key}"))
+    # skips the value at the current token by counting brackets, building nothing
+    def skip_value(self):
+        token = self.current_token
+        if token.type in SCALAR_TYPES:
+            self.get_next_token()
+            return
+        if token.type not in OPENING_TYPES:
+            raise Exception(f"Unexpected token in value: {token}")
+
+        depth = 1
+        if self.tokens is not None:
+            # Token objects can be counted without going through get_next_token
+            for token in self.tokens:
+                self.index += 1
+                if token.type in OPENING_TYPES:
+                    depth += 1
+                elif token.type in CLOSING_TYPES:
+                    depth -= 1
+                    if depth == 0:
+                        self.get_next_token()
+                        return
+            raise Exception("Unexpected end of input while skipping a value")
+
+        while depth:
+            self.get_next_token()
+            token_type = self.current_token.type
+            if token_type in OPENING_TYPES:
+                depth += 1
+            elif token_type in CLOSING_TYPES:
+                depth -= 1
+            elif token_type == TokenType.EOF:
+                raise Exception("Unexpected end of input while skipping a value")
+        self.get_next_token()
 
-        value_node = self.value()
-        node.add_child(value_node)
+    # parses dictionaries
+    def dict(self):
+        if self.current_token.type != TokenType.LCURLY:
+            self.eat(TokenType.LCURLY)
+        return self.container(self.value())
 
+    # parses pairs into Pair nodes
+    def pair(self):
+        key = self.pair_key()
+        node = Node(label="Pair")
+        node.add_child(Node(label=f"Key: {key}"))
+        node.add_child(self.value())
         return node
 
+    # parses the key and colon of a pair, returning the key
+    def pair_key(self):
+        if self.current_token.type != TokenType.STRING:
+            raise Exception(f"Expected string key in pair, got {self.current_token.type}")
+
+        # the lexer's flags say which checks can fail; without flags every check runs
+        if self.current_token.flags != 0:
+            self.validate_empty_key(self.current_token.value)
+            self.validate_reserved_key(self.current_token.value)
+        self.validate_duplicate_keys(self.current_token.value)
+
+        # keys repeat across records, so they share one string
+        key = self.key_table.intern(self.current_token.value)
+        self.eat(TokenType.STRING)
+        self.eat(TokenType.COLON)
+        return key
+
     # parses values
     def value(self):
-        node = Node()
-        token = self.current_token
+        steps = self.value_steps()
+        try:
+            while True:
+                next(steps)
+        except StopIteration as done:
+            return done.value
 
-        if token.type == TokenType.STRING:
-            self.validate_reserved_strings(token.value)
-            self.eat(TokenType.STRING)
-            node = Node(label=f"String: {token.value}")
-            return node
-        elif token.type == TokenType.NUMBER:
-            self.validate_decimal_number(token.value)
-            self.validate_number_format(token.value)
-            self.eat(TokenType.NUMBER)
-            node = Node(label=f"Number: {token.value}")
-            return node
-        elif token.type == TokenType.BOOLEAN:
-            self.eat(TokenType.BOOLEAN)
-            node = Node(label=f"Boolean: {token.value}")
-            return node
-        elif token.type == TokenType.NULL:
-            self.eat(TokenType.NULL)
-            node = Node(label="Null", is_leaf=True)
-            return node
-        elif token.type == TokenType.LCURLY:
-            node.add_child(self.dict())
-            return node
-        elif token.type == TokenType.LSQUARE:
-            node.add_child(self.list())
-            return node
-        else:
-            raise Exception(f"Unexpected token in value: {token}")
+    # parses a value without recursion, pausing (yielding None) before each value it
+    # starts so callers can interleave other work; the parsed value is the generator's
+    # return value. Dictionaries and lists that are still open are kept on an explicit
+    # stack of [container, is_dict, pending key or first list type] frames, so nesting
+    # depth is only limited by memory.
+    def value_steps(self):
+        builder = self.builder
+        stack = []
 
-    # parses lists
-    def list(self):
-        self.eat(TokenType.LSQUARE)
+        while True:
+            yield
+            token = self.current_token
+            token_type = token.type
 
-        node = Node(label="List")
+            # --- a value starts at the current token ---
+            # values are only validated when the lexer flagged them, or left them unflagged
+            if token_type == TokenType.STRING:
+                if token.flags is None or token.flags & TokenFlag.RESERVED:
+                    self.validate_reserved_strings(token.value)
+                self.eat(TokenType.STRING)
+                result = builder.string(token.value)
+            elif token_type == TokenType.NUMBER:
+                if token.flags != 0:
+                    # numbers are validated in the form the tokenized text format stores them in
+                    text = token.value if isinstance(token.value, str) else str(token.value)
+                    self.validate_decimal_number(text)
+                    self.validate_number_format(text)
+                self.eat(TokenType.NUMBER)
+                result = builder.number(token.value)
+            elif token_type == TokenType.BOOLEAN:
+                self.eat(TokenType.BOOLEAN)
+                result = builder.boolean(token.value)
+            elif token_type == TokenType.NULL:
+                self.eat(TokenType.NULL)
+                result = builder.null()
+            elif token_type == TokenType.LCURLY:
+                self.eat(TokenType.LCURLY)
+                self.dict_stack.append(set())
+                container = builder.start_dict()
 
-        # checks for an empty list
-        if self.current_token.type == TokenType.RSQUARE:
-            self.eat(TokenType.RSQUARE)
-            return node
+                # checks for an empty dictionary
+                if self.current_token.type == TokenType.RCURLY:
+                    self.eat(TokenType.RCURLY)
+                    result = builder.end_dict(container)
+                else:
+                    key = self.pair_key()
+                    builder.key(container, key)
+                    stack.append([container, True, key])
+                    continue
+            elif token_type == TokenType.LSQUARE:
+                self.eat(TokenType.LSQUARE)
+                container = builder.start_list()
 
-        # get the first value and its type
-        first_value = self.current_token
-        first_type = first_value.type
-        value_node = self.value()
-        node.add_child(value_node)
+                # checks for an empty list
+                if self.current_token.type == TokenType.RSQUARE:
+                    self.eat(TokenType.RSQUARE)
+                    result = builder.end_list(container)
+                else:
+                    # the first value's type is what the rest of the list is checked against
+                    stack.append([container, False, self.current_token.type])
+                    continue
+            else:
+                raise Exception(f"Unexpected token in value: {token}")
 
-        # iterates through the list values
-        while self.current_token.type == TokenType.COMMA:
-            self.eat(TokenType.COMMA)
+            # --- the value is complete: add it to the enclosing containers, closing them ---
+            while stack:
+                frame = stack[-1]
+                container = frame[0]
+                if frame[1]:
+                    builder.set_item(container, frame[2], result)
+                    if self.current_token.type == TokenType.COMMA:
+                        self.eat(TokenType.COMMA)
+                        frame[2] = self.pair_key()
+                        builder.key(container, frame[2])
+                        break
+                    self.eat(TokenType.RCURLY)
+                    self.dict_stack.pop()
+                    stack.pop()
+                    result = builder.end_dict(container)
+                else:
+                    builder.append(container, result)
+                    if self.current_token.type == TokenType.COMMA:
+                        self.eat(TokenType.COMMA)
 
-            # check if current value type matches first value type
-            self.validate_list_types(first_type, self.current_token.type)
+                        # check if current value type matches first value type
+                        if self.current_token.type != frame[2]:
+                            self.validate_list_types(frame[2], self.current_token.type)
+                        break
+                    self.eat(TokenType.RSQUARE)
+                    stack.pop()
+                    result = builder.end_list(container)
+            else:
+                return result
 
-            value_node = self.value()
-            node.add_child(value_node)
+    # parses lists
+    def list(self):
+        if self.current_token.type != TokenType.LSQUARE:
+            self.eat(TokenType.LSQUARE)
+        return self.container(self.value())
 
-        self.eat(TokenType.RSQUARE)
-        return node
+    # dict() and list() return the Dictionary or List node itself, not the unlabeled
+    # Node that value() wraps it in
+    def container(self, result):
+        if isinstance(result, Node) and result.label is None and len(result.children) == 1:
+            return result.children[0]
+        return result
 
     # Type 1 Error
     def validate_decimal_number(self, value):
@@ -301,8 +838,7 @@ class Parser:
 
     # Type 4 Error
     def validate_reserved_key(self, key):
-        reserved_words = ['true', 'false', 'null']
-        if key.lower() in reserved_words:
+        if key.lower() in RESERVED_WORDS:
             self.errors.append(f"Type 4 Error: Reserved word '{key}' cannot be used as dictionary key")
             return False
         return True
@@ -323,7 +859,7 @@ class Parser:
 
     # Type 6 Error
     def validate_list_types(self, first_type, current_type):
-        if first_type in [TokenType.LSQUARE, TokenType.LCURLY]:
+        if first_type in OPENING_TYPES:
             return True
         if current_type != first_type:
             self.errors.append("Type 6 Error: Inconsistent types in list")
@@ -332,8 +868,7 @@ class Parser:
 
     # Type 7 Error
     def validate_reserved_strings(self, value):
-        reserved_words = ['true', 'false', 'null']
-        if isinstance(value, str) and value.lower() in reserved_words:
+        if isinstance(value, str) and value.lower() in RESERVED_WORDS:
             self.errors.append(f"Type 7 Error: Reserved word '{value}' cannot be used as a string")
             return False
         return True
@@ -353,24 +888,173 @@ class Parser:
             raise IOError(f"Couldn't write errors to output file: {e}")
 
 
-if __name__ == "__main__":
+# Decodes tokens from a buffer in the binary token format written by Scanner.py
+def decode_binary_tokens(data):
+    if bytes(data[:len(TokenTag.MAGIC)]) != TokenTag.MAGIC:
+        raise Exception("Invalid binary token file: bad header")
 
-    for i in range(5):
+    simple_tokens = {
+        TokenTag.LCURLY: LCURLY_TOKEN,
+        TokenTag.RCURLY: RCURLY_TOKEN,
+        TokenTag.LSQUARE: LSQUARE_TOKEN,
+        TokenTag.RSQUARE: RSQUARE_TOKEN,
+        TokenTag.COMMA: COMMA_TOKEN,
+        TokenTag.COLON: COLON_TOKEN,
+        TokenTag.TRUE: TRUE_TOKEN,
+        TokenTag.FALSE: FALSE_TOKEN,
+        TokenTag.NULL: NULL_TOKEN,
+    }
+    unpack_length = TokenTag.LENGTH.unpack_from
+    unpack_number = TokenTag.NUMBER_RECORD.unpack_from
+    record_size = TokenTag.LENGTH.size
+    number_size = TokenTag.NUMBER_RECORD.size
+    interned = []
+    position = len(TokenTag.MAGIC)
+    end = len(data)
+
+    try:
+        while position < end:
+            tag = data[position]
+            token = simple_tokens.get(tag)
+            if token is not None:
+                position += 1
+                yield token
+            elif tag == TokenTag.NUMBER:
+                value = unpack_number(data, position)[1]
+                position += number_size
+                yield Token(TokenType.NUMBER, value, number_flags(value))
+            elif tag == TokenTag.STRING or tag == TokenTag.STRING_DEF:
+                length = unpack_length(data, position)[1]
+                position += record_size
+                if position + length > end:
+                    raise struct.error("truncated string")
+                value = str(data[position:position + length], 'utf-8')
+                position += length
+                token = Token(TokenType.STRING, value, string_flags(value))
+                if tag == TokenTag.STRING_DEF:
+                    interned.append(token)
+                yield token
+            elif tag == TokenTag.STRING_REF:
+                index = unpack_length(data, position)[1]
+                position += record_size
+                # tokens are never modified, so every reference yields the same one
+                yield interned[index]
+            else:
+                raise struct.error(f"unknown tag {tag}")
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise Exception(f"Invalid binary token file at byte {position}: {e}")
+
+
+# Reads a binary token file by memory-mapping it and decoding the records in place.
+# Iterating yields the tokens. close(), or leaving a with block, unmaps the file, also
+# when parsing stopped before the last token.
+class BinaryTokenFile:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
         try:
-            input_file = open(f'tokenized/tokens{i}.txt', 'r')
-            input_string = input_file.readlines()
-        except Exception as e:
-            raise Exception("Couldn't open input text file")
+            # mmap cannot map an empty file, which has no header either
+            if os.fstat(self.file.fileno()).st_size == 0:
+                raise Exception("Invalid binary token file: empty file")
+            self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        self.data = memoryview(self.mapped)
+        self.tokens = decode_binary_tokens(self.data)
 
+    def __iter__(self):
+        return self.tokens
+
+    def close(self):
+        if self.data is None:
+            return
+        self.tokens.close()
+        self.data.release()
+        self.mapped.close()
+        self.file.close()
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_binary_tokens(path):
+    return BinaryTokenFile(path)
+
+
+# Lexes and parses a JSON document in memory, returning the result and the list of errors.
+# The result is a Node tree, or plain Python objects when native is True. With
+# shared_keys, dictionaries are SharedKeyDicts that share their key layouts.
+def parse_json(text, native=False, shared_keys=False):
+    parser = Parser.from_lexer(Lexer(text))
+    if shared_keys:
+        builder = SharedKeyBuilder()
+    else:
+        builder = NativeBuilder() if native else None
+    result = parser.parse(builder)
+    return result, parser.errors
+
+
+# Lexes and validates a JSON document in memory without building it, returning the list
+# of errors. fail_fast stops at the first error, like max_errors=1.
+def validate_json(text, max_errors=None, fail_fast=False):
+    if fail_fast:
+        max_errors = 1
+    return Parser.from_lexer(Lexer(text)).validate(max_errors)
+
+
+# Lexes a JSON document in memory and extracts the values at the given paths, returning
+# the results and the list of errors found in the matched values like parse_json
+def extract_json(text, paths):
+    parser = Parser.from_lexer(Lexer(text))
+    results = parser.extract(paths)
+    return results, parser.errors
+
+
+if __name__ == "__main__":
+
+    # --binary reads tokenized/tokens<i>.bin written by Scanner.py --binary
+    binary = "--binary" in sys.argv[1:]
+    # --stats prints parser statistics for each input as JSON lines
+    show_stats = "--stats" in sys.argv[1:]
+    if show_stats:
+        from Stats import Stats
+
+    for i in range(5):
         output = f'outputs/output{i}.txt'
-        parser = Parser(input_string)
-        tree = parser.parse()
+
+        token_file = None
+        if binary:
+            token_file = read_binary_tokens(f'tokenized/tokens{i}.bin')
+            parser = Parser.from_tokens(token_file)
+        else:
+            try:
+                input_file = open(f'tokenized/tokens{i}.txt', 'r')
+                input_string = input_file.readlines()
+            except Exception as e:
+                raise Exception("Couldn't open input text file")
+            parser = Parser(input_string)
+        stats = Stats() if show_stats else None
+        if stats is not None:
+            stats.attach_parser(parser)
+        try:
+            tree = parser.parse()
+        finally:
+            if token_file is not None:
+                token_file.close()
 
         if parser.errors_exist():
             # print abstract tree
             try:
                 output_file = open(output, 'w')
-                tree.print_tree(file=output_file)
+                if stats is not None:
+                    with stats.phase("print_tree"):
+                        tree.print_tree(file=output_file)
+                else:
+                    tree.print_tree(file=output_file)
             except Exception as e:
                 raise Exception("Couldn't write to output file")
         else:
@@ -380,3 +1064,6 @@ if __name__ == "__main__":
                 parser.print_errors(file=output_file)
             except Exception as e:
                 raise Exception("Couldn't write to output file")
+
+        if stats is not None:
+            stats.write_json_lines(sys.stdout, input=i)
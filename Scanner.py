@@ -1,3 +1,12 @@
+import codecs
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 # Defines token types to be returned to the class Token
 class TokenType:
     LCURLY = 'LCURLY'       # '{'
@@ -12,11 +21,37 @@ class TokenType:
     NULL = 'NULL'           # Null values
     EOF = 'EOF'             # End of input
 
-# Creates Tokens based off the TokenType class when given the type and optional value parameter
+# Facts about a string or number token that the parser's validators depend on,
+# recorded once when the lexer recognizes the token
+class TokenFlag:
+    RESERVED = 1        # string is true, false or null in any letter case
+    BLANK = 2           # string is empty or only whitespace
+    PLUS_EXPONENT = 4   # number's text form has a + exponent (1e+16 and up)
+
+RESERVED_WORDS = frozenset(('true', 'false', 'null'))
+
+def string_flags(value):
+    flags = 0
+    # lower() never shortens a string, so longer strings cannot be reserved words
+    if len(value) < 6 and value.lower() in RESERVED_WORDS:
+        flags = TokenFlag.RESERVED
+    if not value or value.isspace():
+        flags |= TokenFlag.BLANK
+    return flags
+
+def number_flags(value):
+    # str(float) switches to exponent notation, written with a +, from 1e16 on
+    return TokenFlag.PLUS_EXPONENT if 1e16 <= abs(value) < math.inf else 0
+
+# Creates Tokens based off the TokenType class when given the type and optional value parameter.
+# flags holds TokenFlag bits, or is None when they were never computed.
 class Token:
-    def __init__(self, type_, value=None):
+    __slots__ = ('type', 'value', 'flags')
+
+    def __init__(self, type_, value=None, flags=None):
         self.type = type_
         self.value = value
+        self.flags = flags
 
     def __repr__(self):
         if self.type == TokenType.STRING:
@@ -40,159 +75,181 @@ class Token:
         else:
             return f"<{self.type}>"
 
+# Shared tokens for punctuation, keywords and end of input. Tokens are never modified
+# after creation, so every occurrence can reuse the same object.
+LCURLY_TOKEN = Token(TokenType.LCURLY)
+RCURLY_TOKEN = Token(TokenType.RCURLY)
+LSQUARE_TOKEN = Token(TokenType.LSQUARE)
+RSQUARE_TOKEN = Token(TokenType.RSQUARE)
+COMMA_TOKEN = Token(TokenType.COMMA)
+COLON_TOKEN = Token(TokenType.COLON)
+TRUE_TOKEN = Token(TokenType.BOOLEAN, True)
+FALSE_TOKEN = Token(TokenType.BOOLEAN, False)
+NULL_TOKEN = Token(TokenType.NULL)
+EOF_TOKEN = Token(TokenType.EOF)
+
+# Character classes used to index the DFA transition table
+class CharClass:
+    OTHER = 0       # Anything without a transition of its own
+    NUMBER = 1      # Digits, '.', '-' and '+'
+    QUOTE = 2       # '"'
+    CONTROL = 3     # '\n', '\t' and '\r' (not allowed inside strings)
+    T = 4
+    R = 5
+    U = 6
+    E = 7
+    F = 8
+    A = 9
+    L = 10
+    S = 11
+    N = 12
+    COUNT = 13
+
+    # Precomputed classes for ASCII; other characters are classified by classify()
+    ASCII = {}
+    for _code in range(128):
+        _char = chr(_code)
+        if _char.isdigit() or _char in '.-+':
+            ASCII[_char] = NUMBER
+        elif _char == '"':
+            ASCII[_char] = QUOTE
+        elif _char in '\n\t\r':
+            ASCII[_char] = CONTROL
+        else:
+            ASCII[_char] = {'t': T, 'r': R, 'u': U, 'e': E, 'f': F, 'a': A,
+                            'l': L, 's': S, 'n': N}.get(_char, OTHER)
+    del _code, _char
+
+    @staticmethod
+    def classify(symbol):
+        char_class = CharClass.ASCII.get(symbol)
+        if char_class is not None:
+            return char_class
+        # End of input (None) ends numbers the same way any other character does
+        if symbol is not None and symbol.isdigit():
+            return CharClass.NUMBER
+        return CharClass.OTHER
+
 # DFA Class responsible for doing state transitions for non-terminal data types
 class DFA:
+    START = 0
+    INVALID = 1
+    START_NUMBER = 2
+    START_STRING = 3
+    START_TRUE = 4
+    START_FALSE = 5
+    START_NULL = 6
+
+    END_NUMBER = 7
+    END_STRING = 8
+
+    TRUE_2 = 9
+    TRUE_3 = 10
+    END_TRUE = 11
+
+    FALSE_2 = 12
+    FALSE_3 = 13
+    FALSE_4 = 14
+    END_FALSE = 15
+
+    NULL_2 = 16
+    NULL_3 = 17
+    END_NULL = 18
+
+    STATE_COUNT = 19
+
+    # Bitsets over states, tested with (1 << state) & mask
+    ACCEPTING = (1 << END_NUMBER) | (1 << END_STRING) | (1 << END_TRUE) | (1 << END_FALSE) | (1 << END_NULL)
+    NUMBER_STOP = (1 << END_NUMBER) | (1 << INVALID)
+    STRING_STOP = (1 << END_STRING) | (1 << INVALID)
+    TRUE_STOP = (1 << END_TRUE) | (1 << INVALID)
+    FALSE_STOP = (1 << END_FALSE) | (1 << INVALID)
+    NULL_STOP = (1 << END_NULL) | (1 << INVALID)
+
     # Defines states
     def __init__(self):
         self.states = {
-            "START": 0,
-            "INVALID": 1,
-            "START_NUMBER": 2,
-            "START_STRING": 3,
-            "START_TRUE": 4,
-            "START_FALSE": 5,
-            "START_NULL": 6,
-
-            "END_NUMBER": 7,
-            "END_STRING": 8,
-
-            "2_TRUE": 9,
-            "3_TRUE": 10,
-            "END_TRUE": 11,
-
-            "2_FALSE": 12,
-            "3_FALSE": 13,
-            "4_FALSE": 14,
-            "END_FALSE": 15,
-
-            "2_NULL": 16,
-            "3_NULL": 17,
-            "END_NULL": 18,
+            "START": self.START,
+            "INVALID": self.INVALID,
+            "START_NUMBER": self.START_NUMBER,
+            "START_STRING": self.START_STRING,
+            "START_TRUE": self.START_TRUE,
+            "START_FALSE": self.START_FALSE,
+            "START_NULL": self.START_NULL,
+
+            "END_NUMBER": self.END_NUMBER,
+            "END_STRING": self.END_STRING,
+
+            "2_TRUE": self.TRUE_2,
+            "3_TRUE": self.TRUE_3,
+            "END_TRUE": self.END_TRUE,
+
+            "2_FALSE": self.FALSE_2,
+            "3_FALSE": self.FALSE_3,
+            "4_FALSE": self.FALSE_4,
+            "END_FALSE": self.END_FALSE,
+
+            "2_NULL": self.NULL_2,
+            "3_NULL": self.NULL_3,
+            "END_NULL": self.END_NULL,
         }
 
-        self.current_state = self.states["START"]
+        self.table = DFA.TABLE
+        self.current_state = self.START
 
-    # Defines transitions
-    def transition(self, symbol):
+    # Builds the state-by-character-class transition table shared by every DFA
+    @staticmethod
+    def build_table():
+        table = [[DFA.INVALID] * CharClass.COUNT for _ in range(DFA.STATE_COUNT)]
 
         # --- START DFA ---
-
-        if self.current_state == self.states["START"]:
-            if symbol.isdigit() or symbol in ['.', '-', '+']:
-                self.current_state = self.states["START_NUMBER"]
-            elif symbol == '"':
-                self.current_state = self.states["START_STRING"]
-            elif symbol == "t":
-                self.current_state = self.states["START_TRUE"]
-            elif symbol == "f":
-                self.current_state = self.states["START_FALSE"]
-            elif symbol == "n":
-                self.current_state = self.states["START_NULL"]
-            else:
-                self.current_state = self.states["INVALID"]
+        table[DFA.START][CharClass.NUMBER] = DFA.START_NUMBER
+        table[DFA.START][CharClass.QUOTE] = DFA.START_STRING
+        table[DFA.START][CharClass.T] = DFA.START_TRUE
+        table[DFA.START][CharClass.F] = DFA.START_FALSE
+        table[DFA.START][CharClass.N] = DFA.START_NULL
 
         # --- NUMBER DFA ---
-
-        elif self.current_state == self.states["START_NUMBER"]:
-            if symbol.isdigit() or symbol in ['.', '-', '+']:
-                self.current_state = self.states["START_NUMBER"]
-            else:
-                self.current_state = self.states["END_NUMBER"]
-        elif self.current_state == self.states ["END_NUMBER"]:
-            self.current_state = self.states["INVALID"]
+        table[DFA.START_NUMBER] = [DFA.END_NUMBER] * CharClass.COUNT
+        table[DFA.START_NUMBER][CharClass.NUMBER] = DFA.START_NUMBER
 
         # --- STRING DFA ---
-
-        elif self.current_state == self.states["START_STRING"]:
-            if symbol == '"':
-                self.current_state = self.states["END_STRING"]
-            elif symbol in ['\n', '\t', '\r']:
-                self.current_state = self.states["INVALID"]
-            elif symbol == "\\":
-                self.current_state = self.states["START_STRING"]
-            else:
-                self.current_state = self.states["START_STRING"]
-        elif self.current_state == self.states["END_STRING"]:
-            self.current_state = self.states["INVALID"]
+        table[DFA.START_STRING] = [DFA.START_STRING] * CharClass.COUNT
+        table[DFA.START_STRING][CharClass.QUOTE] = DFA.END_STRING
+        table[DFA.START_STRING][CharClass.CONTROL] = DFA.INVALID
 
         # --- TRUE DFA ---
-
-        elif self.current_state == self.states["START_TRUE"]:
-            if symbol == "r":
-                self.current_state = self.states["2_TRUE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["2_TRUE"]:
-            if symbol == "u":
-                self.current_state = self.states["3_TRUE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["3_TRUE"]:
-            if symbol == "e":
-                self.current_state = self.states["END_TRUE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["END_TRUE"]:
-            self.current_state = self.states["INVALID"]
+        table[DFA.START_TRUE][CharClass.R] = DFA.TRUE_2
+        table[DFA.TRUE_2][CharClass.U] = DFA.TRUE_3
+        table[DFA.TRUE_3][CharClass.E] = DFA.END_TRUE
 
         # --- FALSE DFA ---
-
-        elif self.current_state == self.states["START_FALSE"]:
-            if symbol == "a":
-                self.current_state = self.states["2_FALSE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["2_FALSE"]:
-            if symbol == "l":
-                self.current_state = self.states["3_FALSE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["3_FALSE"]:
-            if symbol == "s":
-                self.current_state = self.states["4_FALSE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["4_FALSE"]:
-            if symbol == "e":
-                self.current_state = self.states["END_FALSE"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["END_FALSE"]:
-            self.current_state = self.states["INVALID"]
+        table[DFA.START_FALSE][CharClass.A] = DFA.FALSE_2
+        table[DFA.FALSE_2][CharClass.L] = DFA.FALSE_3
+        table[DFA.FALSE_3][CharClass.S] = DFA.FALSE_4
+        table[DFA.FALSE_4][CharClass.E] = DFA.END_FALSE
 
         # --- NULL DFA ---
+        table[DFA.START_NULL][CharClass.U] = DFA.NULL_2
+        table[DFA.NULL_2][CharClass.L] = DFA.NULL_3
+        table[DFA.NULL_3][CharClass.L] = DFA.END_NULL
 
-        elif self.current_state == self.states["START_NULL"]:
-            if symbol == "u":
-                self.current_state = self.states["2_NULL"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["2_NULL"]:
-            if symbol == "l":
-                self.current_state = self.states["3_NULL"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["3_NULL"]:
-            if symbol == "l":
-                self.current_state = self.states["END_NULL"]
-            else:
-                self.current_state = self.states["INVALID"]
-        elif self.current_state == self.states["END_NULL"]:
-            self.current_state = self.states["INVALID"]
-
-        # --- INVALID DFA ---
+        # End states and INVALID only ever lead to INVALID, which is the default
+        return tuple(tuple(row) for row in table)
 
-        elif self.current_state == self.states["INVALID"]:
-            self.current_state = self.states["INVALID"]
+    # Defines transitions
+    def transition(self, symbol):
+        self.current_state = self.table[self.current_state][CharClass.classify(symbol)]
 
     # Resets DFA to start state
     def reset(self):
-        self.current_state = self.states["START"]
+        self.current_state = self.START
 
     # Checks to see if current state is one of the final states
     def is_accepting(self):
-        return self.current_state in [self.states["END_STRING"], self.states["END_NUMBER"], self.states["END_TRUE"],
-                                      self.states["END_FALSE"], self.states["END_NULL"]]
+        return bool((1 << self.current_state) & self.ACCEPTING)
+
+DFA.TABLE = DFA.build_table()
 
 # Exception to be raised in instance that character is invalid
 class LexerError(Exception):
@@ -201,12 +258,43 @@ class LexerError(Exception):
         self.character = character
         super().__init__(f"Invalid character '{character}' at position {position}")
 
+# Bounded table of interned strings. A string seen again is returned as the first copy
+# of it, so keys repeated across records share one object. Once max_size strings are
+# held, or for strings longer than max_length, strings are passed through unchanged.
+class InternTable:
+    def __init__(self, max_size=65536, max_length=256):
+        self.strings = {}
+        self.max_size = max_size
+        self.max_length = max_length
+
+    def intern(self, string):
+        interned = self.strings.get(string)
+        if interned is not None:
+            return interned
+        if len(self.strings) < self.max_size and len(string) <= self.max_length:
+            self.strings[string] = string
+        return string
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, string):
+        return string in self.strings
+
 class Lexer:
-    def __init__(self, input_text):
+    # Patterns used by the bulk lexing mode (get_next_token_fast)
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+    NUMBER_PATTERN = re.compile(r'[0-9.+\-]+')
+    STRING_STOP_PATTERN = re.compile(r'["\n\t\r]')
+    KEYWORDS = {'t': ("true", TRUE_TOKEN), 'f': ("false", FALSE_TOKEN), 'n': ("null", NULL_TOKEN)}
+    PUNCTUATION = {'{': LCURLY_TOKEN, '}': RCURLY_TOKEN, '[': LSQUARE_TOKEN,
+                   ']': RSQUARE_TOKEN, ',': COMMA_TOKEN, ':': COLON_TOKEN}
+
+    def __init__(self, input_text, intern_table=None):
         self.input_text = input_text
         self.position = 0
         self.current_char = self.input_text[self.position] if self.input_text else None
-        self.symbol_table = {}
+        self.intern_table = intern_table if intern_table is not None else InternTable()
         self.dfa = DFA()
 
     def advance(self):
@@ -216,86 +304,102 @@ class Lexer:
         else:
             self.current_char = self.input_text[self.position]
 
+    # Moves the lexer to an absolute position in the input
+    def seek(self, position):
+        self.position = position
+        if position >= len(self.input_text):
+            self.current_char = None
+        else:
+            self.current_char = self.input_text[position]
+
     def skip_whitespace(self):
-        while self.current_char is not None and self.current_char.isspace():
-            self.advance()
+        text = self.input_text
+        length = len(text)
+        position = self.position
+        while position < length and text[position].isspace():
+            position += 1
+        self.seek(position)
 
     def recognize_number(self):
-        result = ""
-        stop_states = [self.dfa.states["END_NUMBER"], self.dfa.states["INVALID"]]
-
-        while self.dfa.current_state not in stop_states:
-            self.dfa.transition(self.current_char)
-            if self.dfa.current_state not in stop_states:
-                result += self.current_char
-                self.advance()
+        text = self.input_text
+        length = len(text)
+        start = position = self.position
+        table = self.dfa.table
+        ascii_classes = CharClass.ASCII
+        classify = CharClass.classify
+        state = self.dfa.current_state
+
+        while not (1 << state) & DFA.NUMBER_STOP:
+            char = text[position] if position < length else None
+            char_class = ascii_classes.get(char)
+            state = table[state][char_class if char_class is not None else classify(char)]
+            if not (1 << state) & DFA.NUMBER_STOP:
+                position += 1
+        self.dfa.current_state = state
+        self.seek(position)
 
         if self.dfa.is_accepting():
-            return Token(TokenType.NUMBER, float(result))
+            value = float(text[start:position])
+            return Token(TokenType.NUMBER, value, number_flags(value))
         else:
             raise LexerError(self.position, self.current_char)
 
     def recognize_string(self):
-        result = ""
         self.advance() # Skips beginning double quote
-        stop_states = [self.dfa.states["END_STRING"], self.dfa.states["INVALID"]]
-
-        while self.current_char is not None and self.dfa.current_state not in stop_states:
-            self.dfa.transition(self.current_char)
-            if self.dfa.current_state not in stop_states:
-                result += self.current_char
-                self.advance()
-
-        if self.dfa.current_state == self.dfa.states["END_STRING"]:
+        text = self.input_text
+        length = len(text)
+        start = position = self.position
+        table = self.dfa.table
+        ascii_classes = CharClass.ASCII
+        classify = CharClass.classify
+        state = self.dfa.current_state
+
+        while position < length and not (1 << state) & DFA.STRING_STOP:
+            char = text[position]
+            char_class = ascii_classes.get(char)
+            state = table[state][char_class if char_class is not None else classify(char)]
+            if not (1 << state) & DFA.STRING_STOP:
+                position += 1
+        self.dfa.current_state = state
+        self.seek(position)
+        result = text[start:position]
+
+        if state == DFA.END_STRING:
             self.advance() # Skips end double quote
         else:
             raise LexerError(self.position, self.current_char)
 
-        self.symbol_table[result] = "STRING"
-        return Token(TokenType.STRING, result)
+        result = self.intern_table.intern(result)
+        return Token(TokenType.STRING, result, string_flags(result))
 
-    def recognize_true(self):
-        stop_states = [self.dfa.states["END_TRUE"], self.dfa.states["INVALID"]]
+    # Runs the keyword DFA until it accepts or fails, advancing past matched characters
+    def recognize_keyword(self, stop_states):
+        table = self.dfa.table
+        classify = CharClass.classify
+        state = self.dfa.current_state
 
-        while self.dfa.current_state not in stop_states:
-            self.dfa.transition(self.current_char)
-            if self.dfa.current_state not in stop_states:
+        while not (1 << state) & stop_states:
+            state = table[state][classify(self.current_char)]
+            if not (1 << state) & stop_states:
                 self.advance()
+        self.dfa.current_state = state
 
         if self.dfa.is_accepting():
             self.advance()
-            return Token(TokenType.BOOLEAN, True)
         else:
             raise LexerError(self.position, self.current_char)
 
-    def recognize_false(self):
-        stop_states = [self.dfa.states["END_FALSE"], self.dfa.states["INVALID"]]
-
-        while self.dfa.current_state not in stop_states:
-            self.dfa.transition(self.current_char)
-            if self.dfa.current_state not in stop_states:
-                self.advance()
+    def recognize_true(self):
+        self.recognize_keyword(DFA.TRUE_STOP)
+        return TRUE_TOKEN
 
-        if self.dfa.is_accepting():
-            self.advance()
-            return Token(TokenType.BOOLEAN, False)
-        else:
-            raise LexerError(self.position, self.current_char)
+    def recognize_false(self):
+        self.recognize_keyword(DFA.FALSE_STOP)
+        return FALSE_TOKEN
 
     def recognize_null(self):
-        stop_states = [self.dfa.states["END_NULL"], self.dfa.states["INVALID"]]
-
-        while self.dfa.current_state not in stop_states:
-            self.dfa.transition(self.current_char)
-            if self.dfa.current_state not in stop_states:
-                self.advance()
-
-        if self.dfa.is_accepting():
-            # self.dfa.reset()
-            self.advance()
-            return Token(TokenType.NULL)
-        else:
-            raise LexerError(self.position, self.current_char)
+        self.recognize_keyword(DFA.NULL_STOP)
+        return NULL_TOKEN
 
     def get_next_token(self):
         self.dfa.reset()
@@ -303,24 +407,10 @@ class Lexer:
             if self.current_char.isspace():
                 self.skip_whitespace()
                 continue
-            elif self.current_char == '{':  # Terminals
-                self.advance()
-                return Token(TokenType.LCURLY)
-            elif self.current_char == '}':
+            elif self.current_char in self.PUNCTUATION:  # Terminals
+                token = self.PUNCTUATION[self.current_char]
                 self.advance()
-                return Token(TokenType.RCURLY)
-            elif self.current_char == '[':
-                self.advance()
-                return Token(TokenType.LSQUARE)
-            elif self.current_char == ']':
-                self.advance()
-                return Token(TokenType.RSQUARE)
-            elif self.current_char == ',':
-                self.advance()
-                return Token(TokenType.COMMA)
-            elif self.current_char == ':':
-                self.advance()
-                return Token(TokenType.COLON)
+                return token
             # Check for these BEFORE DFA transition
             elif self.current_char == 't':
                 return self.recognize_true()
@@ -330,19 +420,92 @@ class Lexer:
                 return self.recognize_null()
             else:  # Now handle numbers and strings
                 self.dfa.transition(self.current_char)
-                if self.dfa.current_state == self.dfa.states["START_NUMBER"]:
+                if self.dfa.current_state == DFA.START_NUMBER:
                     return self.recognize_number()
-                elif self.dfa.current_state == self.dfa.states["START_STRING"]:
+                elif self.dfa.current_state == DFA.START_STRING:
                     return self.recognize_string()
                 else:
                     raise LexerError(self.position, self.current_char)
-        return Token(TokenType.EOF)
-
-    def tokenize(self):
+        return EOF_TOKEN
+
+    # Bulk lexing mode: finds whole whitespace runs, strings, numbers and keywords with
+    # one regex match or find() and slices them out, falling back to the DFA path only
+    # when it has to produce the same LexerError the character-by-character path would
+    def get_next_token_fast(self):
+        text = self.input_text
+        length = len(text)
+        position = self.position
+
+        while position < length:
+            char = text[position]
+            if char.isspace():
+                position = self.WHITESPACE_PATTERN.match(text, position).end()
+                continue
+            elif char in self.PUNCTUATION:
+                self.seek(position + 1)
+                return self.PUNCTUATION[char]
+            elif char == '"':
+                match = self.STRING_STOP_PATTERN.search(text, position + 1)
+                # Unterminated string or a control character: same error as the DFA path
+                if match is None:
+                    self.seek(length)
+                    raise LexerError(self.position, self.current_char)
+                if match.group() != '"':
+                    self.seek(match.start())
+                    raise LexerError(self.position, self.current_char)
+                self.seek(match.end())
+                result = text[position + 1:match.start()]
+                result = self.intern_table.intern(result)
+                return Token(TokenType.STRING, result, string_flags(result))
+            elif char in self.KEYWORDS:
+                keyword, token = self.KEYWORDS[char]
+                if not text.startswith(keyword, position):
+                    self.seek(position)
+                    return self.get_next_token()
+                self.seek(position + len(keyword))
+                return token
+            else:
+                match = self.NUMBER_PATTERN.match(text, position)
+                # Non-ASCII digits and invalid characters go through the DFA path
+                if match is None or (match.end() < length and not text[match.end()].isascii()):
+                    self.seek(position)
+                    return self.get_next_token()
+                self.seek(match.end())
+                value = float(match.group())
+                return Token(TokenType.NUMBER, value, number_flags(value))
+
+        self.seek(position)
+        return EOF_TOKEN
+
+    # Iterates over the tokens of the input, raising LexerError on invalid input
+    def __iter__(self):
+        while True:
+            token = self.get_next_token_fast()
+            if token.type == TokenType.EOF:
+                return
+            yield token
+
+    # Lazily tokenizes a file object read chunk_size characters (or bytes) at a time.
+    # Unlike tokenize(), lexical errors are raised, with positions in the whole input.
+    @classmethod
+    def iter_tokens(cls, fileobj, chunk_size=65536):
+        stream = StreamLexer()
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield from stream.feed(chunk)
+        yield from stream.close()
+        if stream.error is not None:
+            raise stream.error
+
+    # Tokenizes the whole input; fast=True uses the bulk lexing mode
+    def tokenize(self, fast=False):
+        next_token = self.get_next_token_fast if fast else self.get_next_token
         tokens = []
         while True:
             try:
-                token = self.get_next_token()
+                token = next_token()
             except LexerError as e:
                 print(f"Lexical Error: {e}")
                 break
@@ -351,18 +514,399 @@ class Lexer:
             tokens.append(token)
         return tokens
 
+# Lexer over raw UTF-8 bytes: bytes, bytearray, mmap or memoryview. The input is never
+# decoded as a whole; only the payloads of string tokens are. Positions, including
+# those in LexerErrors, are byte offsets. Only ASCII digits start numbers.
+class ByteLexer(Lexer):
+    WHITESPACE_BYTES = re.compile(rb'[ \t\n\r\x0b\x0c\x1c-\x1f]+')
+    NUMBER_BYTES = re.compile(rb'[0-9.+\-]+')
+    STRING_STOP_BYTES = re.compile(rb'["\n\t\r]')
+    PUNCTUATION_BYTES = {ord(char): token for char, token in Lexer.PUNCTUATION.items()}
+    KEYWORD_BYTES = {ord(char): (keyword.encode(), token) for char, (keyword, token) in Lexer.KEYWORDS.items()}
+    NUMBER_START_BYTES = frozenset(b'0123456789.+-')
+
+    def __init__(self, data, intern_table=None):
+        self.input_text = data
+        self.position = 0
+        self.intern_table = intern_table if intern_table is not None else InternTable()
+        self.dfa = DFA()
+        self.mapped = None
+
+    # Memory-maps a file and returns a ByteLexer over it; close() releases the mapping
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return cls(b'')
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        lexer = cls(mapped)
+        lexer.mapped = mapped
+        return lexer
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Decodes the (possibly multi-byte) character starting at a byte offset
+    def char_at(self, position):
+        data = self.input_text
+        if position >= len(data):
+            return None
+        lead = data[position]
+        size = 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        return bytes(data[position:position + size]).decode('utf-8', errors='replace')
+
+    @property
+    def current_char(self):
+        return self.char_at(self.position)
+
+    def seek(self, position):
+        self.position = position
+
+    def advance(self):
+        self.position += 1
+
+    def get_next_token(self):
+        return self.get_next_token_fast()
+
+    def get_next_token_fast(self):
+        data = self.input_text
+        length = len(data)
+        position = self.position
+
+        while position < length:
+            byte = data[position]
+            token = self.PUNCTUATION_BYTES.get(byte)
+            if token is not None:
+                self.position = position + 1
+                return token
+            elif byte == 0x22:  # '"'
+                match = self.STRING_STOP_BYTES.search(data, position + 1)
+                if match is None:
+                    self.position = length
+                    raise LexerError(length, None)
+                if data[match.start()] != 0x22:
+                    self.position = match.start()
+                    raise LexerError(self.position, self.current_char)
+                self.position = match.end()
+                result = str(data[position + 1:match.start()], 'utf-8')
+                result = self.intern_table.intern(result)
+                return Token(TokenType.STRING, result, string_flags(result))
+            elif byte in self.KEYWORD_BYTES:
+                keyword, token = self.KEYWORD_BYTES[byte]
+                for offset in range(1, len(keyword)):
+                    if position + offset >= length or data[position + offset] != keyword[offset]:
+                        self.position = position + offset
+                        raise LexerError(self.position, self.current_char)
+                self.position = position + len(keyword)
+                return token
+            elif byte in self.NUMBER_START_BYTES:
+                end = self.NUMBER_BYTES.match(data, position).end()
+                self.position = end
+                value = float(bytes(data[position:end]))
+                return Token(TokenType.NUMBER, value, number_flags(value))
+            else:
+                match = self.WHITESPACE_BYTES.match(data, position)
+                if match is not None:
+                    position = match.end()
+                    continue
+                char = self.char_at(position)
+                if byte >= 0x80 and char.isspace():
+                    position += len(char.encode('utf-8'))
+                    continue
+                self.position = position
+                raise LexerError(position, char)
+
+        self.position = position
+        return EOF_TOKEN
+
+
+# Incremental lexer that is fed the input in chunks and hands back tokens as soon as
+# they are complete. Only the unconsumed tail of the input is kept, so memory stays
+# bounded by the largest single token rather than by the size of the document.
+# A lexical error is held back until the tokens before it have been returned, and is
+# raised by the next call to feed() or close().
+class StreamLexer:
+    def __init__(self):
+        self.pending = []       # Chunks received since the last scan
+        self.buffer = ""        # Unconsumed input, starting at self.offset
+        self.buffered = 0       # Length of buffer plus pending chunks
+        self.offset = 0         # Absolute position of buffer[0] in the whole input
+        self.rescan_at = 0      # Buffer length at which an unfinished token is retried
+        self.decoder = None
+        self.error = None
+        self.intern_table = InternTable()  # Shared by the lexers of every scan
+
+    # Adds a chunk of text (or UTF-8 bytes) and returns the tokens it completed
+    def feed(self, chunk):
+        if self.error is not None:
+            raise self.error
+        if isinstance(chunk, (bytes, bytearray)):
+            if self.decoder is None:
+                self.decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = self.decoder.decode(chunk)
+        if chunk:
+            self.pending.append(chunk)
+            self.buffered += len(chunk)
+        # A token still running off the end is only rescanned once the buffer has doubled
+        if self.buffered < self.rescan_at:
+            return []
+        return self.scan(final=False)
+
+    # Signals the end of input and returns the remaining tokens
+    def close(self):
+        if self.error is not None:
+            raise self.error
+        if self.decoder is not None:
+            tail = self.decoder.decode(b'', final=True)
+            if tail:
+                self.pending.append(tail)
+                self.buffered += len(tail)
+        return self.scan(final=True)
+
+    def scan(self, final):
+        if self.pending:
+            self.buffer += "".join(self.pending)
+            self.pending = []
+        buffer = self.buffer
+        length = len(buffer)
+        lexer = Lexer(buffer, self.intern_table)
+        tokens = []
+
+        while True:
+            start = lexer.position
+            try:
+                token = lexer.get_next_token_fast()
+            except LexerError as e:
+                # Errors at the end of the buffer may just be a token cut off by the chunking
+                if not final and e.position >= length:
+                    lexer.seek(start)
+                    break
+                self.error = LexerError(e.position + self.offset, e.character)
+                break
+            except ValueError as e:
+                if not final and lexer.position >= length:
+                    lexer.seek(start)
+                    break
+                self.error = e
+                break
+            # A token touching the end of the buffer might continue in the next chunk
+            if token.type == TokenType.EOF or (not final and lexer.position >= length):
+                lexer.seek(start)
+                break
+            tokens.append(token)
+
+        consumed = lexer.position
+        self.buffer = buffer[consumed:]
+        self.buffered = len(self.buffer)
+        self.offset += consumed
+        self.rescan_at = 2 * self.buffered if not tokens else 0
+        return tokens
+
+
+# Lexes one chunk of a larger input for tokenize_parallel. Since a chunk may begin
+# inside a string, it is lexed twice: once from its first character, and once from
+# just after its first quote, as if that quote closed a string. Each speculation stops
+# at the first token that is invalid or might continue past the chunk, and is returned
+# as (start, end, type, value, flags) tuples with positions in the whole input.
+def lex_chunk(chunk, base):
+    speculations = []
+    quote = chunk.find('"')
+    for start in (0, quote + 1) if quote >= 0 else (0,):
+        lexer = Lexer(chunk)
+        lexer.seek(start)
+        tokens = []
+        while True:
+            match = Lexer.WHITESPACE_PATTERN.match(chunk, lexer.position)
+            if match is not None:
+                lexer.seek(match.end())
+            token_start = lexer.position
+            try:
+                token = lexer.get_next_token_fast()
+            except (LexerError, ValueError):
+                break
+            if token.type == TokenType.EOF or lexer.position >= len(chunk):
+                break
+            tokens.append((base + token_start, base + lexer.position, token.type, token.value, token.flags))
+        speculations.append(tokens)
+    return speculations
+
+
+# Shared tokens for the (type, value) pairs lex_chunk sends back without a payload
+SHARED_TOKENS = {(token.type, token.value): token for token in
+                 (LCURLY_TOKEN, RCURLY_TOKEN, LSQUARE_TOKEN, RSQUARE_TOKEN, COMMA_TOKEN,
+                  COLON_TOKEN, TRUE_TOKEN, FALSE_TOKEN, NULL_TOKEN)}
+
+
+# Tokenizes a large input by lexing chunk_size pieces of it in parallel worker processes
+# and stitching the results together. Wherever a speculative chunk has a token starting
+# exactly where the true token stream needs one, the rest of that chunk's tokens are
+# reused as-is. Only tokens around chunk boundaries, or in chunks whose speculations
+# both went wrong, are lexed again serially. The result (and any printed lexical error)
+# is exactly what Lexer(text).tokenize() produces.
+def tokenize_parallel(text, workers=None, chunk_size=1 << 20):
+    if workers == 1 or len(text) <= chunk_size:
+        return Lexer(text).tokenize(fast=True)
+
+    starts = range(0, len(text), chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lex_chunk, (text[start:start + chunk_size] for start in starts), starts))
+
+    lexer = Lexer(text)
+    tokens = []
+    position = 0
+    for chunk_end, speculations in zip(list(starts[1:]) + [len(text)], results):
+        indexes = [{token[0]: i for i, token in enumerate(speculation)} for speculation in speculations]
+        while position < chunk_end:
+            match = Lexer.WHITESPACE_PATTERN.match(text, position)
+            if match is not None:
+                position = match.end()
+                if position >= chunk_end:
+                    break
+
+            # reuse a speculation that is in step with the true token stream
+            for speculation, index in zip(speculations, indexes):
+                i = index.get(position)
+                if i is not None:
+                    for start, end, token_type, value, flags in speculation[i:]:
+                        token = SHARED_TOKENS.get((token_type, value))
+                        if token is None:
+                            if token_type == TokenType.STRING:
+                                value = lexer.intern_table.intern(value)
+                            token = Token(token_type, value, flags)
+                        tokens.append(token)
+                    position = speculation[-1][1]
+                    break
+            else:
+                # lex one token serially, which also reproduces any error exactly
+                lexer.seek(position)
+                try:
+                    token = lexer.get_next_token_fast()
+                except LexerError as e:
+                    print(f"Lexical Error: {e}")
+                    return tokens
+                if token.type == TokenType.EOF:
+                    return tokens
+                tokens.append(token)
+                position = lexer.position
+    return tokens
+
+
+# One-byte tags of the binary token file format. A file starts with MAGIC and is
+# followed by one record per token: the tag, then a payload for strings (uint32 length
+# and UTF-8 bytes), interned string references (uint32 table index) and numbers
+# (little-endian float64). STRING_DEF records also append their string to the table.
+class TokenTag:
+    MAGIC = b'JTOK\x01'
+
+    LCURLY = 1
+    RCURLY = 2
+    LSQUARE = 3
+    RSQUARE = 4
+    COMMA = 5
+    COLON = 6
+    STRING = 7
+    STRING_DEF = 8
+    STRING_REF = 9
+    NUMBER = 10
+    TRUE = 11
+    FALSE = 12
+    NULL = 13
+
+    LENGTH = struct.Struct('<BI')     # tag + uint32 length or table index
+    NUMBER_RECORD = struct.Struct('<Bd')
+
+    PUNCTUATION = {TokenType.LCURLY: LCURLY, TokenType.RCURLY: RCURLY, TokenType.LSQUARE: LSQUARE,
+                   TokenType.RSQUARE: RSQUARE, TokenType.COMMA: COMMA, TokenType.COLON: COLON}
+
+
+# Writes tokens to a binary file object in the TokenTag format. Repeated strings are
+# written once and referenced by index afterwards, up to intern_limit distinct strings.
+def write_binary_tokens(tokens, file, intern=True, intern_limit=65536):
+    intern_table = {}
+    buffer = bytearray(TokenTag.MAGIC)
+    pack_length = TokenTag.LENGTH.pack
+    pack_number = TokenTag.NUMBER_RECORD.pack
+
+    for token in tokens:
+        token_type = token.type
+        if token_type == TokenType.STRING:
+            index = intern_table.get(token.value)
+            if index is not None:
+                buffer += pack_length(TokenTag.STRING_REF, index)
+                continue
+            data = token.value.encode('utf-8')
+            if intern and len(intern_table) < intern_limit:
+                intern_table[token.value] = len(intern_table)
+                buffer += pack_length(TokenTag.STRING_DEF, len(data))
+            else:
+                buffer += pack_length(TokenTag.STRING, len(data))
+            buffer += data
+        elif token_type == TokenType.NUMBER:
+            buffer += pack_number(TokenTag.NUMBER, token.value)
+        elif token_type == TokenType.BOOLEAN:
+            buffer.append(TokenTag.TRUE if token.value else TokenTag.FALSE)
+        elif token_type == TokenType.NULL:
+            buffer.append(TokenTag.NULL)
+        else:
+            buffer.append(TokenTag.PUNCTUATION[token_type])
+
+        if len(buffer) >= 1 << 16:
+            file.write(buffer)
+            buffer = bytearray()
+
+    file.write(buffer)
+
+
 # Testing the Lexer with input
 if __name__ == "__main__":
+    # --binary writes tokenized/tokens<i>.bin in the TokenTag format instead of text
+    binary = "--binary" in sys.argv[1:]
+    # --stats prints lexer statistics for each input as JSON lines
+    show_stats = "--stats" in sys.argv[1:]
+    if show_stats:
+        from Stats import Stats
+    # --mmap memory-maps each input and scans it as bytes with ByteLexer, which only
+    # accepts ASCII digits in numbers and reports byte offsets in errors
+    memory_map = "--mmap" in sys.argv[1:]
+
     for i in range(5):
         try:
-            input_file = open(f'tests/input{i}.txt', 'r')
-            input_string = input_file.read()
+            if memory_map:
+                lexer = ByteLexer.open(f'tests/input{i}.txt')
+            else:
+                input_file = open(f'tests/input{i}.txt', 'r')
+                input_string = input_file.read()
+                lexer = Lexer(input_string)
         except Exception as e:
             raise Exception("Couldn't open input text file")
 
         output = f'tokenized/tokens{i}.txt'
-        lexer = Lexer(input_string)
-        tokens = lexer.tokenize()
+        try:
+            if show_stats:
+                stats = Stats()
+                stats.attach_lexer(lexer)
+            tokens = lexer.tokenize()
+        finally:
+            if memory_map:
+                lexer.close()
+        if show_stats:
+            stats.write_json_lines(sys.stdout, input=i)
+
+        if binary:
+            try:
+                with open(f'tokenized/tokens{i}.bin', 'wb') as output_file:
+                    write_binary_tokens(tokens, output_file)
+            except Exception as e:
+                raise Exception("Couldn't write to output file")
+            continue
 
         try:
             output_file = open(output, 'w')
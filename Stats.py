@@ -0,0 +1,231 @@
+import json
+import time
+from contextlib import contextmanager
+
+from Scanner import TokenType
+
+VALIDATORS = ('validate_decimal_number', 'validate_empty_key', 'validate_number_format',
+              'validate_reserved_key', 'validate_duplicate_keys', 'validate_list_types',
+              'validate_reserved_strings')
+
+# The phase each type of token is timed as by attach_lexer; end of input is not timed
+TOKEN_PHASES = {TokenType.STRING: "lex.string", TokenType.NUMBER: "lex.number",
+                TokenType.BOOLEAN: "lex.keyword", TokenType.NULL: "lex.keyword",
+                TokenType.LCURLY: "lex.punctuation", TokenType.RCURLY: "lex.punctuation",
+                TokenType.LSQUARE: "lex.punctuation", TokenType.RSQUARE: "lex.punctuation",
+                TokenType.COMMA: "lex.punctuation", TokenType.COLON: "lex.punctuation"}
+
+
+# Opt-in counters and timers for a Lexer and a Parser. attach_lexer and attach_parser
+# replace methods of those instances only with timed and counted wrappers, so lexers
+# and parsers without stats run exactly the code they always did.
+#
+# Phases record wall and CPU time and a call count. They are inclusive: "parse.tokens"
+# includes the lexing of a parser fed straight from a lexer, and "parse" includes
+# everything. A phase entered again while it is running (get_next_token_fast falling
+# back to get_next_token) is only timed once.
+#
+# Tokens are counted by the lexer when one is attached, and otherwise by the parser as
+# it reads them. bytes_scanned counts characters for str input and the lines of the
+# tokenized text format; it is not counted for token objects read without a lexer.
+#
+# Validators are counted as they are called: runs is how many checks actually ran, and
+# fired how many of them failed. The parser skips the checks that the lexer's flags say
+# cannot fail, so with a lexer most tokens are never checked and runs is small; tokens
+# without flags (the tokenized text format) run every check.
+class Stats:
+    def __init__(self):
+        self.phases = {}  # name -> [wall seconds, CPU seconds, calls]
+        self.active = {}  # name -> how deeply the phase is running
+        self.token_counts = {}
+        self.bytes_scanned = 0
+        self.max_depth = 0
+        self.largest_string = 0
+        self.largest_array = 0
+        self.validators = {}  # name -> [runs, fired]
+        self.lexer_attached = False
+        self.containers = []  # element counts of open lists, None for dictionaries
+        self.opened_list = False
+
+    # Times a block of code as the named phase
+    @contextmanager
+    def phase(self, name):
+        record = self.phases.setdefault(name, [0.0, 0.0, 0])
+        record[2] += 1
+        depth = self.active.get(name, 0)
+        self.active[name] = depth + 1
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.active[name] = depth
+            if not depth:
+                record[0] += time.perf_counter() - wall
+                record[1] += time.process_time() - cpu
+
+    # Wraps function so each call is timed as the named phase
+    def timed(self, name, function):
+        record = self.phases.setdefault(name, [0.0, 0.0, 0])
+        active = self.active
+        perf_counter = time.perf_counter
+        process_time = time.process_time
+
+        def wrapper(*args, **kwargs):
+            record[2] += 1
+            depth = active.get(name, 0)
+            if depth:
+                active[name] = depth + 1
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    active[name] = depth
+            active[name] = 1
+            wall = perf_counter()
+            cpu = process_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record[0] += perf_counter() - wall
+                record[1] += process_time() - cpu
+                active[name] = 0
+
+        return wrapper
+
+    # Counts a token and tracks nesting depth, string lengths and list lengths
+    def observe(self, token):
+        token_type = token.type
+        if token_type == TokenType.EOF:
+            return
+        self.token_counts[token_type] = self.token_counts.get(token_type, 0) + 1
+        containers = self.containers
+        if self.opened_list:
+            self.opened_list = False
+            if token_type != TokenType.RSQUARE:
+                containers[-1] += 1
+
+        if token_type == TokenType.STRING:
+            if isinstance(token.value, str) and len(token.value) > self.largest_string:
+                self.largest_string = len(token.value)
+        elif token_type == TokenType.LCURLY or token_type == TokenType.LSQUARE:
+            is_list = token_type == TokenType.LSQUARE
+            containers.append(0 if is_list else None)
+            self.opened_list = is_list
+            if len(containers) > self.max_depth:
+                self.max_depth = len(containers)
+        elif token_type == TokenType.COMMA:
+            if containers and containers[-1] is not None:
+                containers[-1] += 1
+        elif token_type == TokenType.RCURLY or token_type == TokenType.RSQUARE:
+            if containers:
+                count = containers.pop()
+                if count is not None and count > self.largest_array:
+                    self.largest_array = count
+
+    # Instruments a Lexer (or ByteLexer): token reads are timed as "lex", and again by
+    # the type of token they return as "lex.string", "lex.number", "lex.keyword" and
+    # "lex.punctuation" (including skipped whitespace), whichever of get_next_token and
+    # get_next_token_fast read them. Every token is counted.
+    def attach_lexer(self, lexer):
+        self.lexer_attached = True
+        lexer.stats = self
+        lexer.get_next_token = self.counted(lexer, lexer.get_next_token)
+        lexer.get_next_token_fast = self.counted(lexer, lexer.get_next_token_fast)
+        return lexer
+
+    def counted(self, lexer, function):
+        timed = self.timed("lex", function)
+        active = self.active
+        phases = self.phases
+        perf_counter = time.perf_counter
+        process_time = time.process_time
+
+        def wrapper():
+            if active.get("lex", 0):
+                return timed()
+            position = lexer.position
+            wall = perf_counter()
+            cpu = process_time()
+            token = timed()
+            wall = perf_counter() - wall
+            cpu = process_time() - cpu
+            name = TOKEN_PHASES.get(token.type)
+            if name is not None:
+                record = phases.setdefault(name, [0.0, 0.0, 0])
+                record[0] += wall
+                record[1] += cpu
+                record[2] += 1
+            self.bytes_scanned += lexer.position - position
+            self.observe(token)
+            return token
+
+        return wrapper
+
+    # Instruments a Parser: parse() is timed as "parse", reading tokens (decoding the
+    # tokenized text format, or pulling them from a lexer) as "parse.tokens", and each
+    # validator as its own phase, counting how often it runs and how often it fails
+    def attach_parser(self, parser):
+        parser.stats = self
+        parser.parse = self.timed("parse", parser.parse)
+        if parser.tokens is None:
+            parser.lexer = self.scanned_lines(parser.lexer)
+        next_token = self.timed("parse.tokens", parser.get_next_token)
+
+        def get_next_token():
+            token = next_token()
+            if not self.lexer_attached:
+                self.observe(token)
+            return token
+
+        parser.get_next_token = get_next_token
+        for name in VALIDATORS:
+            setattr(parser, name, self.checked(name, getattr(parser, name)))
+        return parser
+
+    def scanned_lines(self, lines):
+        for line in lines:
+            self.bytes_scanned += len(line)
+            yield line
+
+    def checked(self, name, validator):
+        timed = self.timed(name, validator)
+        record = self.validators.setdefault(name, [0, 0])
+
+        def wrapper(*args):
+            record[0] += 1
+            passed = timed(*args)
+            if passed is False:
+                record[1] += 1
+            return passed
+
+        return wrapper
+
+    def as_dict(self):
+        return {
+            "phases": {name: {"wall": wall, "cpu": cpu, "calls": calls}
+                       for name, (wall, cpu, calls) in self.phases.items()},
+            "tokens": dict(self.token_counts),
+            "bytes_scanned": self.bytes_scanned,
+            "max_depth": self.max_depth,
+            "largest_string": self.largest_string,
+            "largest_array": self.largest_array,
+            "validators": {name: {"runs": runs, "fired": fired}
+                           for name, (runs, fired) in self.validators.items()},
+        }
+
+    # Yields one JSON object per line: the document counters, then each phase, token
+    # type and validator. labels (such as a file name) are added to every line.
+    def json_lines(self, **labels):
+        stats = self.as_dict()
+        document = {key: stats[key] for key in ("bytes_scanned", "max_depth", "largest_string", "largest_array")}
+        yield json.dumps({**labels, "kind": "document", **document})
+        for name, phase in stats["phases"].items():
+            yield json.dumps({**labels, "kind": "phase", "name": name, **phase})
+        for name, count in stats["tokens"].items():
+            yield json.dumps({**labels, "kind": "tokens", "name": name, "count": count})
+        for name, validator in stats["validators"].items():
+            yield json.dumps({**labels, "kind": "validator", "name": name, **validator})
+
+    def write_json_lines(self, file, **labels):
+        for line in self.json_lines(**labels):
+            file.write(line + "\n")
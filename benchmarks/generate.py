@@ -0,0 +1,88 @@
+# Seeded generators for synthetic benchmark documents. Each shape stresses a different
+# part of the lexer and parser; size is roughly the document size in bytes.
+# Run from the repository root: python3 benchmarks/generate.py <shape> [size] [seed]
+import random
+import sys
+
+
+# Homogeneous records like tests/input3.txt: the same keys in every array element
+def records(rng, size):
+    items = []
+    total = 0
+    while total < size:
+        item = ('{"userId": %d, "id": %d, "title": "%s", "completed": %s}'
+                % (rng.randint(1, 10), len(items) + 1, words(rng, rng.randint(3, 8)),
+                   "true" if rng.random() < 0.5 else "false"))
+        items.append(item)
+        total += len(item) + 2
+    return "[" + ",\n".join(items) + "]"
+
+
+# One object with many distinct keys
+def wide(rng, size):
+    pairs = []
+    total = 0
+    while total < size:
+        value = rng.choice((str(rng.randint(0, 10 ** 6)), '"%s"' % words(rng, 2), "true", "null"))
+        pair = '"key_%d": %s' % (len(pairs), value)
+        pairs.append(pair)
+        total += len(pair) + 2
+    return "{" + ", ".join(pairs) + "}"
+
+
+# Many chains of dictionaries and lists nested depth levels deep
+def deep(rng, size, depth=100):
+    chains = []
+    total = 0
+    while total < size:
+        chain = str(rng.randint(0, 1000))
+        for level in range(depth):
+            chain = '{"level": %d, "next": %s}' % (level, chain) if level % 2 else "[%s]" % chain
+        chains.append(chain)
+        total += len(chain) + 2
+    return "[" + ", ".join(chains) + "]"
+
+
+# An array of long strings, 1 to 16 KB each
+def strings(rng, size):
+    items = []
+    total = 0
+    while total < size:
+        item = '"%s"' % words(rng, rng.randint(150, 2500))
+        items.append(item)
+        total += len(item) + 2
+    return "[" + ", ".join(items) + "]"
+
+
+# A large array of decimal numbers
+def numbers(rng, size):
+    items = []
+    total = 0
+    while total < size:
+        item = "%d.%03d" % (rng.randint(-10 ** 6, 10 ** 6), rng.randint(0, 999))
+        items.append(item)
+        total += len(item) + 2
+    return "[" + ", ".join(items) + "]"
+
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "task", "quis", "ut", "nam", "facere",
+         "repellat", "provident", "occaecati", "excepturi", "optio", "reprehenderit")
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+SHAPES = {"records": records, "wide": wide, "deep": deep, "strings": strings, "numbers": numbers}
+
+
+# Generates a document of the given shape; the same seed always gives the same text
+def generate(shape, size=1 << 20, seed=0):
+    return SHAPES[shape](random.Random(f"{shape}:{seed}"), size)
+
+
+if __name__ == "__main__":
+    shape = sys.argv[1] if len(sys.argv) > 1 else "records"
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1 << 20
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    sys.stdout.write(generate(shape, size, seed))
@@ -0,0 +1,74 @@
+# Measures peak and retained memory for lexing and parsing a large generated document of
+# records (see generate.py).
+# Run from the repository root: python3 benchmarks/memory.py [bytes] [--revision REV]
+# With --revision, the same document is measured on the Parser.py and Scanner.py of that
+# git revision and then on the working tree, each in a fresh process, for before/after
+# numbers. Revisions from the in-memory pipeline (Parser.from_tokens) on can be measured.
+# Timings include tracemalloc overhead and are only useful relative to each other.
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+
+from generate import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(label, function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} {elapsed:8.3f} s  peak {peak / 1e6:8.1f} MB  retained {retained / 1e6:8.1f} MB")
+    return result
+
+
+# Measures the lexer and parser found in root
+def run(size, root):
+    sys.path.insert(0, root)
+    from Parser import Parser
+    from Scanner import Lexer
+    if not hasattr(Parser, "from_tokens"):
+        sys.exit(f"{root}: Parser.from_tokens is missing; this revision cannot be measured")
+
+    text = generate("records", size)
+    print(f"input    {len(text) / 1e6:.1f} MB")
+    tokens = measure("lex", lambda: Lexer(text).tokenize(fast=True))
+    tree = measure("parse", lambda: Parser.from_tokens(tokens).parse())
+    del tokens, tree
+    measure("total", lambda: Parser.from_lexer(Lexer(text)).parse())
+
+
+# Measures revision, then the working tree, each in a fresh process
+def compare(size, revision):
+    archive = subprocess.run(["git", "-C", ROOT, "archive", "--format=tar", revision],
+                             check=True, stdout=subprocess.PIPE).stdout
+    with tempfile.TemporaryDirectory() as directory:
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tree:
+            tree.extractall(directory)
+        for label, root in ((revision, directory), ("working tree", ROOT)):
+            print(f"--- {label}", flush=True)
+            status = subprocess.run([sys.executable, os.path.abspath(__file__), str(size), "--root", root]).returncode
+            if status:
+                sys.exit(status)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Measure memory for lexing and parsing.")
+    argument_parser.add_argument("size", nargs="?", type=int, default=8 << 20, help="approximate bytes of input")
+    argument_parser.add_argument("--revision", help="also measure this git revision, for before/after numbers")
+    argument_parser.add_argument("--root", default=ROOT, help=argparse.SUPPRESS)
+    arguments = argument_parser.parse_args()
+
+    if arguments.revision:
+        compare(arguments.size, arguments.revision)
+    else:
+        run(arguments.size, arguments.root)
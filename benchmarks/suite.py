@@ -0,0 +1,133 @@
+# Times lexing, parsing, validation and print_tree separately on generated documents of
+# several shapes (see generate.py), and compares the results against a stored baseline.
+# Run from the repository root: python3 benchmarks/suite.py [--size BYTES] [--baseline PATH]
+# Exits with status 1 when a phase is slower than the baseline by more than --threshold.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import SHAPES, generate
+from Parser import Parser
+from Scanner import Lexer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def print_tree(tree):
+    with open(os.devnull, "w") as output:
+        tree.print_tree(file=output)
+
+
+# Times function repeat times, keeping the best, then runs it once more under
+# tracemalloc for its peak allocation
+def measure(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_shape(shape, size, seed, repeat):
+    text = generate(shape, size, seed)
+    tokens = Lexer(text).tokenize(fast=True)
+    tree = Parser.from_tokens(tokens).parse()
+    phases = {
+        "lex": lambda: Lexer(text).tokenize(fast=True),
+        "parse": lambda: Parser.from_tokens(tokens).parse(),
+        "validate": lambda: Parser.from_tokens(tokens).validate(),
+        "print_tree": lambda: print_tree(tree),
+    }
+    results = {"bytes": len(text.encode("utf-8")), "tokens": len(tokens)}
+    for phase, function in phases.items():
+        seconds, peak = measure(function, repeat)
+        results[phase] = {
+            "seconds": seconds,
+            "mb_per_s": results["bytes"] / 1e6 / seconds,
+            "tokens_per_s": len(tokens) / seconds,
+            "peak_mb": peak / 1e6,
+        }
+    return results
+
+
+# Returns a message for every phase that is more than threshold slower than in baseline
+def compare(results, baseline, threshold):
+    regressions = []
+    for shape, phases in results["shapes"].items():
+        old_phases = baseline["shapes"].get(shape)
+        if old_phases is None or old_phases["bytes"] != phases["bytes"]:
+            continue
+        for phase, result in phases.items():
+            if not isinstance(result, dict) or phase not in old_phases:
+                continue
+            ratio = result["seconds"] / old_phases[phase]["seconds"]
+            if ratio > 1 + threshold:
+                regressions.append(f"{shape} {phase}: {old_phases[phase]['seconds']:.4f} s -> "
+                                   f"{result['seconds']:.4f} s ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lexer, parser, validators and print_tree.")
+    parser.add_argument("--size", type=int, default=1 << 20, help="approximate bytes per document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase; the best is kept")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="comma-separated shapes to run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": args.size,
+        "seed": args.seed,
+        "shapes": {},
+    }
+    print(f"{'shape':<8} {'phase':<10} {'seconds':>9} {'MB/s':>8} {'tokens/s':>11} {'peak MB':>8}")
+    for shape in args.shapes.split(","):
+        phases = run_shape(shape, args.size, args.seed, args.repeat)
+        results["shapes"][shape] = phases
+        for phase, result in phases.items():
+            if isinstance(result, dict):
+                print(f"{shape:<8} {phase:<10} {result['seconds']:9.4f} {result['mb_per_s']:8.2f} "
+                      f"{result['tokens_per_s']:11.0f} {result['peak_mb']:8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as output:
+            json.dump(results, output, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"no phase slower than the baseline by more than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
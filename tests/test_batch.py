@@ -0,0 +1,101 @@
+# Behavior tests for Batch: files give the trees in outputs/, and JSON Lines records give
+# what parse_json gives for each line, in order, in-process and on a pool of workers.
+# Run from the repository root: python3 -m pytest tests
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Batch import parse_json_lines, process_files, process_json_lines_files
+from Parser import parse_json
+
+INPUT_PATHS = [os.path.join(ROOT, f"tests/input{i}.txt") for i in range(5)]
+RECORDS = ['{"id": 1, "tags": ["a", "b"]}', '[1, "x"]', '{"a": 1, "a": 2}', '"true"', '12', '{"": null}',
+           '{"id": 1} {"id": 2}', '{"x": 1}, {"y": 2}', '[1, 2', '{"a": $}']
+
+
+def read(path):
+    with open(path) as input_file:
+        return input_file.read()
+
+
+# What parse_json gives for one line: its native value, errors and exception, if any
+def expected_record(text):
+    try:
+        value, errors = parse_json(text, native=True)
+    except Exception as e:
+        return None, [], str(e)
+    return value, errors, None
+
+
+class ProcessFilesTest(unittest.TestCase):
+    def test_outputs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            for workers in (1, 2):
+                results = list(process_files(INPUT_PATHS, output_dir, workers=workers, chunk_size=2))
+                self.assertEqual([result["path"] for result in results], INPUT_PATHS)
+                for i, result in enumerate(results):
+                    with self.subTest(workers=workers, input=i):
+                        self.assertTrue(result["valid"])
+                        self.assertIsNone(result["exception"])
+                        self.assertEqual(read(result["output"]), read(os.path.join(ROOT, f"outputs/output{i}.txt")))
+
+
+class JsonLinesTest(unittest.TestCase):
+    def lines(self, seed, count):
+        rng = random.Random(seed)
+        return [rng.choice(RECORDS) + "\n" if rng.random() < 0.9 else "\n" for _ in range(count)]
+
+    def test_records_match_parse_json(self):
+        lines = self.lines(12, 300)
+        for workers, chunk_size in ((1, 7), (2, 1), (2, 16)):
+            records = list(parse_json_lines(iter(lines), workers=workers, chunk_size=chunk_size))
+            numbers = [number for number, line in enumerate(lines, 1) if line.strip()]
+            self.assertEqual([record["line"] for record in records], numbers)
+            for record in records:
+                text = lines[record["line"] - 1]
+                value, errors, exception = expected_record(text)
+                with self.subTest(workers=workers, text=text):
+                    if exception is None and record["exception"] is not None:
+                        # one value per line: content after it is an exception
+                        self.assertIn("Unexpected token after value", record["exception"])
+                        continue
+                    self.assertEqual(record["value"], value)
+                    self.assertEqual(record["errors"], errors)
+                    self.assertEqual(record["exception"] is None, exception is None)
+
+    def test_trailing_content_is_rejected(self):
+        for text in ('{"a": 1} {"b": 2}\n', '{"x": 1}, {"y": 2}\n'):
+            record, = parse_json_lines([text], workers=1)
+            self.assertIn("Unexpected token after value", record["exception"])
+
+    # several files share one pool and each gets its own result and output
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i in range(4):
+                paths.append(os.path.join(directory, f"input{i}.jsonl"))
+                with open(paths[-1], "w") as output_file:
+                    output_file.writelines(self.lines(i, 40))
+            output_dir = os.path.join(directory, "outputs")
+            for workers in (1, 2):
+                results = list(process_json_lines_files(paths, output_dir, workers=workers, chunk_size=8))
+                for path, result in zip(paths, results):
+                    with self.subTest(workers=workers, path=path):
+                        lines = read(path).splitlines()
+                        self.assertEqual(result["records"], sum(1 for line in lines if line.strip()))
+                        written = [json.loads(line) for line in io.StringIO(read(result["output"]))]
+                        self.assertEqual(len(written), result["records"])
+                        invalid = sum(1 for line in written if line["errors"] or line["exception"])
+                        self.assertEqual(result["invalid_records"], invalid)
+                        self.assertEqual(result["valid"], invalid == 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
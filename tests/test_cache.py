@@ -0,0 +1,123 @@
+# Behavior tests for ParseCache: results match parse_json and the baseline outputs, and
+# hits, evictions and reloads from disk keep the least recently used order.
+# Run from the repository root: python3 -m pytest tests
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Cache import ParseCache
+from Parser import parse_json
+
+
+def read(path):
+    with open(os.path.join(ROOT, path)) as input_file:
+        return input_file.read()
+
+
+INPUTS = [read(f"tests/input{i}.txt") for i in range(5)]
+OUTPUTS = [read(f"outputs/output{i}.txt") for i in range(5)]
+
+
+def tree_text(tree):
+    output = io.StringIO()
+    tree.print_tree(file=output)
+    return output.getvalue()
+
+
+def pickles(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".pickle"))
+
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_results_match_outputs(self):
+        cache = ParseCache()
+        for _ in range(2):
+            for text, expected in zip(INPUTS, OUTPUTS):
+                tree, errors = cache.parse_json(text)
+                self.assertEqual(tree_text(tree), expected)
+                self.assertEqual(errors, [])
+        # tests/input1.txt and tests/input2.txt are the same document
+        self.assertEqual(cache.stats()["misses"], len(set(INPUTS)))
+        self.assertEqual(cache.stats()["hits"], 10 - len(set(INPUTS)))
+
+    def test_native_and_errors(self):
+        cache = ParseCache()
+        text = '{"a": 1, "a": [2, "x"]}'
+        for _ in range(2):
+            self.assertEqual(cache.parse_json(text, native=True), parse_json(text, native=True))
+        self.assertEqual(tree_text(cache.parse_json(text)[0]), tree_text(parse_json(text)[0]))
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_eviction(self):
+        cache = ParseCache(max_entries=2)
+        for text in ("[1]", "[2]", "[1]", "[3]"):
+            cache.parse_json(text)
+        # [2] was the least recently used
+        cache.parse_json("[1]")
+        cache.parse_json("[3]")
+        self.assertEqual(cache.stats()["misses"], 3)
+        cache.parse_json("[2]")
+        self.assertEqual(cache.stats()["misses"], 4)
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_oversized_inputs_are_not_cached(self):
+        cache = ParseCache(max_bytes=4, directory=self.directory.name)
+        cache.parse_json("[1, 2, 3]")
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(pickles(self.directory.name), [])
+
+    def test_disk_reload(self):
+        cache = ParseCache(directory=self.directory.name)
+        for text in INPUTS:
+            cache.parse_json(text)
+        reloaded = ParseCache(directory=self.directory.name)
+        for text, expected in zip(INPUTS, OUTPUTS):
+            self.assertEqual(tree_text(reloaded.parse_json(text)[0]), expected)
+        self.assertEqual(reloaded.stats()["disk_hits"], len(set(INPUTS)))
+        self.assertEqual(reloaded.stats()["misses"], 0)
+
+    # Memory hits keep files on disk too; the least recently used file goes first
+    def test_disk_eviction_follows_hits(self):
+        cache = ParseCache(max_entries=3, directory=self.directory.name)
+        for text in ("[1]", "[2]", "[3]"):
+            cache.parse_json(text)
+        for _ in range(50):
+            cache.parse_json("[1]")
+        cache.parse_json("[4]")
+        self.assertEqual(len(pickles(self.directory.name)), 3)
+        reloaded = ParseCache(directory=self.directory.name)
+        for text in ("[1]", "[3]", "[4]"):
+            reloaded.parse_json(text)
+        self.assertEqual(reloaded.stats()["disk_hits"], 3)
+        reloaded.parse_json("[2]")
+        self.assertEqual(reloaded.stats()["misses"], 1)
+
+    def test_disk_bytes(self):
+        cache = ParseCache(directory=self.directory.name, max_disk_bytes=1000)
+        for i in range(50):
+            cache.parse_json(f"[{i}]")
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.directory.name, name))
+                                 for name in pickles(self.directory.name)), 1000)
+        self.assertGreater(cache.stats()["disk_evictions"], 0)
+        self.assertEqual(cache.stats()["entries"], 50)
+
+    def test_clear(self):
+        cache = ParseCache(directory=self.directory.name)
+        cache.parse_json("[1]")
+        cache.clear(clear_directory=True)
+        self.assertEqual(pickles(self.directory.name), [])
+        cache.parse_json("[1]")
+        self.assertEqual(cache.stats()["misses"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
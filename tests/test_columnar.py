@@ -0,0 +1,84 @@
+# Behavior tests for Columnar: converted back with to_native, columnar results equal the
+# native results of parse_json, for the inputs in tests/ and for generated lists.
+# Run from the repository root: python3 -m pytest tests
+import os
+import random
+import sys
+import unittest
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Columnar import BoolArray, RecordTable, StringColumn, parse_columnar, to_native
+from Parser import parse_json
+
+
+def read(path):
+    with open(os.path.join(ROOT, path)) as input_file:
+        return input_file.read()
+
+
+INPUTS = [read(f"tests/input{i}.txt") for i in range(5)]
+SCALARS = [lambda rng: str(rng.randint(-99, 99)), lambda rng: rng.choice(['true', 'false']),
+           lambda rng: '"%s"' % rng.choice(['a', 'b c', '', 'é'])]
+
+
+# Lists of one scalar type, records with the same keys, and lists of mixed values
+def generate_list(rng):
+    choice = rng.random()
+    length = rng.randint(0, 20)
+    if choice < 0.5:
+        scalar = rng.choice(SCALARS)
+        return "[" + ", ".join(scalar(rng) for _ in range(length)) + "]"
+    if choice < 0.8:
+        keys = rng.sample(["id", "name", "done", "tags"], rng.randint(1, 4))
+        records = ("{" + ", ".join(f'"{key}": {rng.choice(SCALARS)(rng)}' for key in keys) + "}"
+                   for _ in range(length))
+        return "[" + ", ".join(records) + "]"
+    values = [rng.choice(SCALARS)(rng) for _ in range(length)] + ["[1, 2]", '{"a": [true]}']
+    rng.shuffle(values)
+    return "[" + ", ".join(values) + "]"
+
+
+class ColumnarTest(unittest.TestCase):
+    def assertSameAsNative(self, text, records):
+        result, errors = parse_columnar(text, records)
+        expected, expected_errors = parse_json(text, native=True)
+        self.assertEqual(to_native(result), expected)
+        self.assertEqual(errors, expected_errors)
+
+    def test_inputs(self):
+        for text in INPUTS:
+            for records in (False, True):
+                with self.subTest(text=text, records=records):
+                    self.assertSameAsNative(text, records)
+
+    def test_generated_lists(self):
+        rng = random.Random(19)
+        for _ in range(300):
+            text = '{"values": %s}' % generate_list(rng)
+            for records in (False, True):
+                with self.subTest(text=text, records=records):
+                    self.assertSameAsNative(text, records)
+
+    def test_column_types(self):
+        result, _ = parse_columnar('[[1, 2.5], [true, false, true], ["a", "bc"], [1, "a"]]')
+        self.assertEqual(result[0], array('d', [1.0, 2.5]))
+        self.assertIsInstance(result[1], BoolArray)
+        self.assertEqual(result[1].count(), 2)
+        self.assertEqual(result[1].count(False), 1)
+        self.assertIsInstance(result[2], StringColumn)
+        self.assertEqual(result[2].tolist(), ["a", "bc"])
+        self.assertEqual(result[3], [1.0, "a"])
+
+    def test_records(self):
+        text = read("tests/input3.txt")
+        table = parse_columnar(text, records=True)[0]["tasks"]
+        self.assertIsInstance(table, RecordTable)
+        self.assertEqual(list(table.column("id")), [1.0, 2.0, 3.0])
+        self.assertEqual(table[1], parse_json(text, native=True)[0]["tasks"][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
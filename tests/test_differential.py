@@ -0,0 +1,163 @@
+# Differential tests: the parallel, incremental and async modes must give exactly what
+# Lexer.tokenize and parse_json give for the same text. Inputs are generated from a
+# fixed seed, mixing valid documents with edits that break them.
+# Run from the repository root: python3 -m pytest tests
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AsyncParser import parse_json_async
+from Incremental import IncrementalDocument
+from Parser import Parser, parse_json
+from Scanner import Lexer, tokenize_parallel
+
+SCALARS = ['0', '1', '2.5', '01', '1.', '-3', '1e5', '"a"', '"b c"', '"true"', '""', '"é"', 'true', 'false',
+           'null']
+INSERTIONS = ['', '1', '2', '"', 'x', ' ', ',', ':', '.', 'e', '{', '}', '[', ']', '"q"', '{"k": 1}', '[1, 2]',
+              '٣', '²', '\n']
+
+
+def generate_value(rng, depth=0):
+    choice = rng.random()
+    if depth > 3 or choice < 0.4:
+        return rng.choice(SCALARS)
+    if choice < 0.7:
+        pairs = (f'"{rng.choice("abcd ")}": {generate_value(rng, depth + 1)}' for _ in range(rng.randint(0, 4)))
+        return "{" + ", ".join(pairs) + "}"
+    return "[" + ", ".join(generate_value(rng, depth + 1) for _ in range(rng.randint(0, 4))) + "]"
+
+
+# A generated document, broken by a few random edits about half of the time
+def generate_text(rng):
+    text = generate_value(rng)
+    if rng.random() < 0.5:
+        for _ in range(rng.randint(1, 3)):
+            offset = rng.randint(0, len(text))
+            text = text[:offset] + rng.choice(INSERTIONS) + text[offset + rng.randint(0, 2):]
+    return text
+
+
+# Runs function, returning its result (or the text of the exception it raised) and what
+# it printed
+def outcome(function, *args):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            result = function(*args)
+        except Exception as e:
+            result = ("raised", str(e))
+    return result, output.getvalue()
+
+
+def tree_text(tree):
+    output = io.StringIO()
+    tree.print_tree(file=output)
+    return output.getvalue()
+
+
+class ParallelTokenizeTest(unittest.TestCase):
+    def test_matches_tokenize(self):
+        rng = random.Random(13)
+        for _ in range(40):
+            text = " ".join(generate_text(rng) for _ in range(rng.randint(1, 4)))
+            expected, expected_output = outcome(Lexer(text).tokenize)
+            for chunk_size in (1, 3, 7):
+                tokens, output = outcome(tokenize_parallel, text, 2, chunk_size)
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(list(map(repr, tokens)), list(map(repr, expected)))
+                    self.assertEqual(output, expected_output)
+
+
+class IncrementalTest(unittest.TestCase):
+    # An IncrementalDocument lexes the whole text, so a lexical error after the root
+    # value fails it too; the full parse it matches is Lexer.tokenize, then the parser
+    def full_parse(self, text):
+        tokens, output = outcome(Lexer(text).tokenize)
+        if output:
+            return None, None
+        parser = Parser.from_tokens(tokens)
+        try:
+            return parser.parse(), parser.errors
+        except Exception:
+            return None, None
+
+    def test_edits_match_full_parse(self):
+        rng = random.Random(15)
+        for _ in range(300):
+            document = IncrementalDocument(generate_value(rng))
+            for _ in range(8):
+                offset = rng.randint(0, len(document.text))
+                deleted = rng.randint(0, min(3, len(document.text) - offset))
+                document.edit(offset, deleted, rng.choice(INSERTIONS))
+                with self.subTest(text=document.text):
+                    tree, errors = self.full_parse(document.text)
+                    if tree is None:
+                        self.assertIsNone(document.tree)
+                        self.assertIsNotNone(document.error)
+                    else:
+                        self.assertIsNone(document.error)
+                        self.assertEqual(tree_text(document.tree), tree_text(tree))
+                        self.assertEqual(document.errors, errors)
+            self.assertGreater(document.full_parses + document.incremental_parses, 1)
+
+    # An empty dictionary outside the edited span leaves the edit to a splice
+    def test_empty_dict_elsewhere_splices(self):
+        records = ", ".join('{"id": %d, "tags": [%d, 2], "id": 3}' % (i, i) for i in range(50))
+        document = IncrementalDocument('{"empty": {}, "records": [' + records + '], "empty": 1}')
+        for _ in range(10):
+            offset = document.text.index("[", 30) + 1
+            document.edit(offset, 1, "7")
+            tree, errors = self.full_parse(document.text)
+            self.assertEqual(tree_text(document.tree), tree_text(tree))
+            self.assertEqual(document.errors, errors)
+        self.assertEqual(document.full_parses, 1)
+        self.assertEqual(document.incremental_parses, 10)
+
+        # editing a span that holds an empty dictionary parses the whole document again
+        document.edit(document.text.index("{}") + 1, 0, '"k": 1')
+        self.assertEqual(document.full_parses, 2)
+        tree, errors = self.full_parse(document.text)
+        self.assertEqual(document.errors, errors)
+
+
+class AsyncParseTest(unittest.TestCase):
+    # Feeds text to parse_json_async in random pieces, as str or UTF-8 bytes
+    def parse_async(self, rng, text, native):
+        data = text.encode("utf-8") if rng.random() < 0.5 else text
+
+        async def chunks():
+            position = 0
+            while position < len(data):
+                size = rng.randint(1, 12)
+                yield data[position:position + size]
+                position += size
+
+        return asyncio.run(parse_json_async(chunks(), native=native, chunk_size=rng.randint(1, 16),
+                                            yield_every=rng.randint(1, 50)))
+
+    def test_matches_parse_json(self):
+        rng = random.Random(24)
+        for _ in range(400):
+            text = generate_text(rng)
+            native = rng.random() < 0.5
+            expected, _ = outcome(parse_json, text, native)
+            result, _ = outcome(self.parse_async, rng, text, native)
+            with self.subTest(text=text, native=native):
+                if expected[0] == "raised":
+                    self.assertEqual(result, expected)
+                else:
+                    self.assertEqual(result[1], expected[1])
+                    if native:
+                        self.assertEqual(result[0], expected[0])
+                    else:
+                        self.assertEqual(tree_text(result[0]), tree_text(expected[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+# Round-trip tests for Emitter: parsing what dumps() writes must give back the values it
+# was given, for native values and for Node trees, including numbers that repr() would
+# write with an exponent the lexer does not read.
+# Run from the repository root: python3 -m pytest tests
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Emitter import dumps
+from Parser import Parser, parse_json
+
+NUMBERS = [0.0, -0.0, 1.0, 0.1, -2.5, 1e-05, -2.5e-10, 1e16, 1.2345678901234567e+19, 5e-324, 1.7976931348623157e+308]
+
+
+def generate_number(rng):
+    if rng.random() < 0.3:
+        return rng.choice(NUMBERS)
+    return rng.uniform(-10, 10) * 10.0 ** rng.randint(-30, 30)
+
+
+def generate_value(rng, depth=0):
+    choice = rng.random()
+    if depth > 3 or choice < 0.5:
+        return rng.choice([generate_number(rng), generate_number(rng), "a b", "é", "", True, False])
+    if choice < 0.75:
+        return {f"k{i}": generate_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+    return [generate_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+
+class RoundTripTest(unittest.TestCase):
+    def assertRoundTrip(self, value, indent=None):
+        text = dumps(value, indent)
+        result, _ = parse_json(text, native=True)
+        # repr tells -0.0 from 0.0
+        self.assertEqual(repr(result), repr(value), text)
+
+    def test_numbers(self):
+        for number in NUMBERS:
+            with self.subTest(number=number):
+                self.assertRoundTrip([number])
+                self.assertNotIn("e", dumps([number]))
+
+    def test_native_values(self):
+        rng = random.Random(23)
+        for _ in range(500):
+            value = generate_value(rng)
+            with self.subTest(value=value):
+                self.assertRoundTrip(value, rng.choice([None, 2]))
+
+    def test_trees(self):
+        rng = random.Random(23)
+        for _ in range(500):
+            value = generate_value(rng)
+            with self.subTest(value=value):
+                tree, _ = parse_json(dumps(value))
+                self.assertEqual(repr(parse_json(dumps(tree), native=True)[0]), repr(value))
+
+    # Number labels read from the tokenized text format keep their text unless it has an
+    # exponent; text that is no number cannot be written
+    def test_number_labels(self):
+        text = dumps(Parser(["<[>", "<num, 01>", "<,>", "<num, 1e-5>", "<]>"]).parse())
+        self.assertEqual(text, "[01,0.00001]")
+        self.assertEqual(parse_json(text, native=True)[0], [1.0, 1e-5])
+        with self.assertRaises(Exception):
+            dumps(Parser(["<[>", "<num, 12..34>", "<]>"]).parse())
+
+    def test_infinity(self):
+        with self.assertRaises(Exception):
+            dumps([float("inf")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# Behavior tests for Lazy: walking a LazyDocument gives the native values of parse_json,
+# and validate_all gives its errors, for the inputs in tests/ and generated documents.
+# Run from the repository root: python3 -m pytest tests
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Lazy import LazyDocument, LazyNode
+from Parser import parse_json
+
+SCALARS = ['0', '12', '2.5', '01', '"a"', '"b c"', '"true"', '""', 'true', 'false', 'null']
+
+
+def read(path):
+    with open(os.path.join(ROOT, path)) as input_file:
+        return input_file.read()
+
+
+INPUTS = [read(f"tests/input{i}.txt") for i in range(5)]
+
+
+def generate_value(rng, depth=0):
+    choice = rng.random()
+    if depth > 3 or choice < 0.4:
+        return rng.choice(SCALARS)
+    if choice < 0.7:
+        pairs = (f'"{rng.choice("abcd")}": {generate_value(rng, depth + 1)}' for _ in range(rng.randint(0, 4)))
+        return "{" + ", ".join(pairs) + "}"
+    return "[" + ", ".join(generate_value(rng, depth + 1) for _ in range(rng.randint(0, 4))) + "]"
+
+
+# Reads a lazy value through the node API, the way a caller would
+def walk(value):
+    if not isinstance(value, LazyNode):
+        return value
+    if value.is_dict:
+        return {key: walk(item) for key, item in value.items()}
+    return [walk(item) for item in value]
+
+
+class LazyDocumentTest(unittest.TestCase):
+    def assertSameAsNative(self, text):
+        document = LazyDocument(text)
+        expected, errors = parse_json(text, native=True)
+        self.assertEqual(walk(document.root), expected)
+        if isinstance(document.root, LazyNode):
+            self.assertEqual(document.root.to_native(), expected)
+        self.assertEqual(document.validate_all(), errors)
+
+    def test_inputs(self):
+        for text in INPUTS:
+            with self.subTest(text=text):
+                self.assertSameAsNative(text)
+
+    def test_generated(self):
+        rng = random.Random(20)
+        for _ in range(300):
+            text = generate_value(rng)
+            with self.subTest(text=text):
+                self.assertSameAsNative(text)
+
+    def test_lazy_access(self):
+        document = LazyDocument(read("tests/input3.txt"))
+        tasks = document.root["tasks"]
+        self.assertEqual(len(tasks), 3)
+        self.assertEqual(tasks[1]["title"], "Clean the house")
+        self.assertEqual(list(tasks[0].keys()), ["id", "title", "completed"])
+        self.assertIsNone(tasks.get("id"))
+        self.assertEqual(document.errors, [])
+
+    def test_dictionary_methods_on_lists(self):
+        document = LazyDocument('{"list": [1, 2]}')
+        for method in ("items", "keys"):
+            with self.subTest(method=method):
+                with self.assertRaisesRegex(Exception, "requires a dictionary node"):
+                    getattr(document.root["list"], method)()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,318 @@
+# Behavior tests for the Parser APIs, against the baseline outputs run.sh writes to
+# outputs/ for tests/input<i>.txt and against a full parse of documents with errors.
+# Run from the repository root: python3 -m pytest tests
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Parser import (NativeBuilder, Parser, SharedKeyDict, extract_json, parse_json, parse_path, read_binary_tokens,
+                    select_values, validate_json)
+from Scanner import LCURLY_TOKEN, InternTable, Lexer, Token, TokenType, write_binary_tokens
+
+# Documents with errors of every type, one or several at a time
+INVALID = ['[1, "true", {"": 1}]', '{"a": 1, "a": 2, "null": 1.}', '[01, "x", [+1], true, {"": null}]',
+           '{"a": [1, "b", 2, true], "b": {"c": 1, "c": "False"}}']
+# Scalars and keys that set every token flag, or nearly do
+SCALARS = ['1', '2.5', '10000000000000000', '-12345678901234567890', '9999999999999999', '"a"', '"True"', '"NULL"',
+           '""', '" "', '"x y"', 'true', 'false', 'null']
+KEYS = ['a', 'b', '', '  ', 'true', 'Null', 'a b']
+
+
+def read(path):
+    with open(os.path.join(ROOT, path)) as input_file:
+        return input_file.read()
+
+
+INPUTS = [read(f"tests/input{i}.txt") for i in range(5)]
+OUTPUTS = [read(f"outputs/output{i}.txt") for i in range(5)]
+
+
+def generate_value(rng, depth=0):
+    choice = rng.random()
+    if depth > 3 or choice < 0.4:
+        return rng.choice(SCALARS)
+    if choice < 0.7:
+        pairs = (f'"{rng.choice(KEYS)}": {generate_value(rng, depth + 1)}' for _ in range(rng.randint(0, 4)))
+        return "{" + ", ".join(pairs) + "}"
+    return "[" + ", ".join(generate_value(rng, depth + 1) for _ in range(rng.randint(0, 4))) + "]"
+
+
+def tree_text(tree):
+    output = io.StringIO()
+    tree.print_tree(file=output)
+    return output.getvalue()
+
+
+class BaselineTest(unittest.TestCase):
+    def test_parse_json_matches_outputs(self):
+        for text, expected in zip(INPUTS, OUTPUTS):
+            tree, errors = parse_json(text)
+            self.assertEqual(errors, [])
+            self.assertEqual(tree_text(tree), expected)
+
+
+class NativeBuilderTest(unittest.TestCase):
+    # numbers are all floats, and a duplicate key keeps its last value as in json.loads
+    def test_matches_json_loads(self):
+        for text in INPUTS + [INVALID[0], INVALID[3], '{"a": 1, "a": [2, {"b": null}]}']:
+            with self.subTest(text=text):
+                self.assertEqual(parse_json(text, native=True)[0], json.loads(text, parse_int=float))
+
+    def test_tokenized_text_format(self):
+        for i, text in enumerate(INPUTS):
+            lines = read(f"tokenized/tokens{i}.txt").splitlines()
+            self.assertEqual(Parser(lines).parse(NativeBuilder()), parse_json(text, native=True)[0])
+
+    # every validation still runs, giving the errors the Node tree gets
+    def test_errors_match_tree(self):
+        for text in INVALID:
+            with self.subTest(text=text):
+                self.assertEqual(parse_json(text, native=True)[1], parse_json(text)[1])
+
+
+class SharedKeysTest(unittest.TestCase):
+    def test_matches_native(self):
+        for text in INPUTS + INVALID:
+            with self.subTest(text=text):
+                self.assertEqual(parse_json(text, shared_keys=True), parse_json(text, native=True))
+
+    # records with the same keys share one layout and one string per key
+    def test_records_share_layout(self):
+        tasks = parse_json(INPUTS[3], shared_keys=True)[0]["tasks"]
+        self.assertTrue(all(isinstance(task, SharedKeyDict) for task in tasks))
+        self.assertTrue(all(task.layout is tasks[0].layout for task in tasks))
+        keys = parse_json(INPUTS[3], native=True)[0]["tasks"]
+        self.assertTrue(all(a is b for task in keys[1:] for a, b in zip(task, keys[0])))
+
+    def test_duplicate_keys(self):
+        result = parse_json('[{"a": 1, "a": 2}, {"a": 1}]', shared_keys=True)[0]
+        self.assertEqual(type(result[0]), dict)
+        self.assertEqual(result, [{"a": 2.0}, {"a": 1.0}])
+
+    def test_intern_table_is_bounded(self):
+        table = InternTable(max_size=2, max_length=3)
+        first = "".join(["a", "b"])
+        for string in (first, "long", "cd", "ef"):
+            table.intern(string)
+        self.assertEqual(len(table), 2)
+        self.assertNotIn("long", table)
+        self.assertNotIn("ef", table)
+        self.assertIs(table.intern("".join(["a", "b"])), first)
+
+
+class DeepNestingTest(unittest.TestCase):
+    DEPTH = 20000
+
+    # nesting far beyond the recursion limit, with the duplicate key and list type checks
+    # scoped to the innermost dictionary and list
+    def test_deep_documents(self):
+        depth = self.DEPTH
+        dictionaries = '{"a": ' * depth + '{"a": 1, "a": 2}' + '}' * depth
+        lists = '[' * depth + '1, "x"' + ']' * depth
+        self.assertGreater(depth, sys.getrecursionlimit())
+        for native in (False, True):
+            with self.subTest(native=native):
+                self.assertEqual(parse_json(dictionaries, native)[1], ["Type 5 Error: Duplicate key 'a' in dictionary"])
+                self.assertEqual(parse_json(lists, native)[1], ["Type 6 Error: Inconsistent types in list"])
+                self.assertEqual(validate_json(lists), ["Type 6 Error: Inconsistent types in list"])
+
+        result = parse_json(lists, native=True)[0]
+        for _ in range(depth - 1):
+            result = result[0]
+        self.assertEqual(result, [1.0, "x"])
+
+    # dict(), list() and pair() return their own nodes
+    def test_node_methods(self):
+        parser = Parser.from_lexer(Lexer('{"a": 1}'))
+        parser.get_next_token()
+        self.assertEqual(tree_text(parser.dict()), tree_text(parse_json('{"a": 1}')[0].children[0]))
+        parser = Parser.from_lexer(Lexer('[1, 2]'))
+        parser.get_next_token()
+        self.assertEqual(parser.list().label, "List")
+        parser = Parser.from_lexer(Lexer('"k": [1]'))
+        parser.dict_stack.append(set())
+        parser.get_next_token()
+        pair = parser.pair()
+        self.assertEqual([pair.label, pair.children[0].label], ["Pair", "Key: k"])
+        self.assertEqual(pair.children[1].children[0].label, "List")
+
+
+# Rebuilds the native value that a list of events describes, and collects its errors
+def rebuild(events):
+    stack = [[]]
+    keys = []
+    errors = []
+    for event, value in events:
+        if event == "error":
+            errors.append(value)
+        elif event == "key":
+            keys.append(value)
+        elif event in ("start_object", "start_array"):
+            stack.append({} if event == "start_object" else [])
+        else:
+            if event in ("end_object", "end_array"):
+                value = stack.pop()
+            if isinstance(stack[-1], dict):
+                stack[-1][keys.pop()] = value
+            else:
+                stack[-1].append(value)
+    return stack[0][0], errors
+
+
+class EventTest(unittest.TestCase):
+    def test_matches_parse(self):
+        for text in INPUTS + INVALID:
+            parser = Parser.from_lexer(Lexer(text))
+            events = list(parser.iter_events())
+            with self.subTest(text=text):
+                self.assertEqual(rebuild(events), parse_json(text, native=True))
+                self.assertEqual(parser.errors, parse_json(text)[1])
+
+    # errors come right after the value that caused them, before the next event
+    def test_error_placement(self):
+        events = list(Parser.from_lexer(Lexer('{"a": [1, "x"], "": 2}')).iter_events())
+        self.assertEqual(events, [("start_object", None), ("key", "a"), ("start_array", None), ("value", 1.0),
+                                  ("error", "Type 6 Error: Inconsistent types in list"), ("value", "x"),
+                                  ("end_array", None), ("error", "Type 2 Error: Empty dictionary key"),
+                                  ("key", ""), ("value", 2.0), ("end_object", None)])
+
+    # events arrive as tokens do, before the rest of the input has been read
+    def test_lazy(self):
+        def tokens():
+            yield from Lexer('{"n": 1, "m": {"a": true}').tokenize()
+            raise AssertionError("read past the events taken")
+
+        events = Parser.from_tokens(tokens()).iter_events()
+        self.assertEqual([next(events) for _ in range(4)],
+                         [("start_object", None), ("key", "n"), ("value", 1.0), ("key", "m")])
+
+
+class TokenFlagsTest(unittest.TestCase):
+    # The checks the lexer's flags let the parser skip could not have failed: the text
+    # format and tokens without flags run every check and get the same tree and errors
+    def test_flags_match_every_check(self):
+        rng = random.Random(18)
+        for _ in range(500):
+            text = generate_value(rng)
+            tokens = Lexer(text).tokenize()
+            # the text format writes null as <null>, unlike Token's repr
+            lines = ["<null>" if token.type == TokenType.NULL else str(token) for token in tokens]
+            flagged = Parser.from_tokens(tokens)
+            expected = tree_text(flagged.parse())
+            with self.subTest(text=text):
+                for parser in (Parser(lines), Parser.from_tokens(Token(token.type, token.value) for token in tokens)):
+                    self.assertEqual(tree_text(parser.parse()), expected)
+                    self.assertEqual(parser.errors, flagged.errors)
+
+    # Number formats only the text format can hold are still checked
+    def test_text_format_numbers(self):
+        parser = Parser(["<[>", "<num, 1.>", "<,>", "<num, 01>", "<,>", "<num, +1>", "<,>", "<num, 1e+5>", "<,>",
+                         "<num, 1.5>", "<]>"])
+        parser.parse()
+        self.assertEqual(parser.errors, ["Type 1 Error at 1.: Invalid decimal number format",
+                                         "Type 3 Error at 01: Invalid number format - leading zeros",
+                                         "Type 3 Error at +1: Invalid number format - leading + sign",
+                                         "Type 3 Error at 1e+5: Invalid number format - leading + in exponent"])
+
+
+class ValidateTest(unittest.TestCase):
+    def test_matches_parse(self):
+        for text in INPUTS + INVALID:
+            with self.subTest(text=text):
+                self.assertEqual(validate_json(text), parse_json(text)[1])
+
+    def test_max_errors(self):
+        for text in INVALID:
+            errors = parse_json(text)[1]
+            for max_errors in range(1, len(errors) + 2):
+                with self.subTest(text=text, max_errors=max_errors):
+                    self.assertEqual(validate_json(text, max_errors=max_errors), errors[:max_errors])
+            self.assertEqual(validate_json(text, fail_fast=True), errors[:1])
+
+    def test_max_errors_below_one(self):
+        for max_errors in (0, -1):
+            with self.subTest(max_errors=max_errors):
+                with self.assertRaises(ValueError):
+                    validate_json(INVALID[0], max_errors=max_errors)
+                with self.assertRaises(ValueError):
+                    Parser.from_tokens(iter(())).validate(max_errors)
+
+
+class ExtractTest(unittest.TestCase):
+    PATHS = ["$", "$.id", "$.tasks[*].title", "$.tasks[1]", '$["notifications"].*', "$.*", "$.tasks[*].*",
+             "$.missing", "$.tasks[7]"]
+
+    # extract gives what selecting the paths from a full parse gives
+    def test_matches_full_parse(self):
+        for text in INPUTS:
+            document = parse_json(text, native=True)[0]
+            results, errors = extract_json(text, self.PATHS)
+            with self.subTest(text=text):
+                self.assertEqual(results, {path: select_values(document, parse_path(path)) for path in self.PATHS})
+                self.assertEqual(errors, [])
+
+    # only the matched values are validated, and their errors are returned
+    def test_errors(self):
+        text = '{"a": [1, "x"], "b": {"": 1}, "c": 2}'
+        self.assertEqual(extract_json(text, ["$"])[1], parse_json(text)[1])
+        self.assertEqual(extract_json(text, ["$.a"]), ({"$.a": [[1.0, "x"]]},
+                                                       ["Type 6 Error: Inconsistent types in list"]))
+        self.assertEqual(extract_json(text, ["$.b"])[1], ["Type 2 Error: Empty dictionary key"])
+        self.assertEqual(extract_json(text, ["$.c"]), ({"$.c": [2.0]}, []))
+
+
+class BinaryTokenFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "tokens.bin")
+
+    def write(self, text):
+        with open(self.path, "wb") as output_file:
+            write_binary_tokens(Lexer(text).tokenize(fast=True), output_file)
+
+    def test_round_trip_matches_outputs(self):
+        for text, expected in zip(INPUTS, OUTPUTS):
+            self.write(text)
+            with read_binary_tokens(self.path) as tokens:
+                parser = Parser.from_tokens(tokens)
+                tree = parser.parse()
+            self.assertEqual(tree_text(tree), expected)
+            self.assertEqual(parser.errors, [])
+
+    def test_tokens_match_lexer(self):
+        text = '{"a": [1, 2.5, "b", "b", true, false, null], "a": {}}'
+        self.write(text)
+        with read_binary_tokens(self.path) as tokens:
+            decoded = list(tokens)
+        self.assertEqual(list(map(repr, decoded)), list(map(repr, Lexer(text).tokenize(fast=True))))
+        # punctuation and keywords are the lexer's own shared tokens
+        self.assertIs(decoded[0], LCURLY_TOKEN)
+
+    def test_close_unmaps(self):
+        self.write(INPUTS[3])
+        token_file = read_binary_tokens(self.path)
+        Parser.from_tokens(token_file).validate(max_errors=1)
+        token_file.close()
+        self.assertTrue(token_file.mapped.closed)
+        token_file.close()
+
+    def test_invalid_files(self):
+        for data in (b"", b"not a token file"):
+            with open(self.path, "wb") as output_file:
+                output_file.write(data)
+            with self.subTest(data=data):
+                with self.assertRaisesRegex(Exception, "Invalid binary token file"):
+                    with read_binary_tokens(self.path) as tokens:
+                        list(tokens)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+# Behavior tests for the lexers in Scanner.py, against the baseline token files run.sh
+# writes to tokenized/ for tests/input<i>.txt and against Lexer.tokenize on generated
+# documents, valid or broken by random edits.
+# Run from the repository root: python3 -m pytest tests
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Scanner import DFA, ByteLexer, CharClass, Lexer, LexerError, StreamLexer
+
+SCALARS = ['0', '1', '2.5', '01', '1.', '-3', '"a"', '"b c"', '"true"', '""', '"é"', 'true', 'false', 'null']
+INSERTIONS = ['', '1', '"', 'x', ' ', ',', ':', 'e', 't', 'nu', '{', ']', '"q"', '\t', '\n', '٣']
+
+
+def read(path):
+    with open(os.path.join(ROOT, path)) as input_file:
+        return input_file.read()
+
+
+INPUTS = [read(f"tests/input{i}.txt") for i in range(5)]
+TOKENS = [read(f"tokenized/tokens{i}.txt") for i in range(5)]
+
+
+def generate_value(rng, depth=0):
+    choice = rng.random()
+    if depth > 3 or choice < 0.4:
+        return rng.choice(SCALARS)
+    if choice < 0.7:
+        pairs = (f'"{rng.choice("abcd ")}": {generate_value(rng, depth + 1)}' for _ in range(rng.randint(0, 4)))
+        return "{" + ", ".join(pairs) + "}"
+    return "[" + ", ".join(generate_value(rng, depth + 1) for _ in range(rng.randint(0, 4))) + "]"
+
+
+# A generated document, broken by a few random edits about half of the time
+def generate_text(rng):
+    text = generate_value(rng)
+    if rng.random() < 0.5:
+        for _ in range(rng.randint(1, 3)):
+            offset = rng.randint(0, len(text))
+            text = text[:offset] + rng.choice(INSERTIONS) + text[offset + rng.randint(0, 2):]
+    return text
+
+
+# Runs Lexer(text).tokenize, returning the reprs of its tokens (or the text of the
+# exception it raised) and what it printed
+def tokenize(text, fast=False):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            tokens = list(map(repr, Lexer(text).tokenize(fast=fast)))
+        except Exception as e:
+            tokens = ("raised", str(e))
+    return tokens, output.getvalue()
+
+
+class DFATest(unittest.TestCase):
+    def test_tokens_match_baseline(self):
+        for text, expected in zip(INPUTS, TOKENS):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                tokens = Lexer(text).tokenize()
+            self.assertEqual("".join(f"{token}\n" for token in tokens), expected)
+            self.assertEqual(output.getvalue(), "")
+
+    def test_keywords(self):
+        dfa = DFA()
+        for word, end in (("true", DFA.END_TRUE), ("false", DFA.END_FALSE), ("null", DFA.END_NULL)):
+            dfa.reset()
+            for char in word:
+                self.assertFalse(dfa.is_accepting())
+                dfa.transition(char)
+            self.assertEqual(dfa.current_state, end)
+            self.assertTrue(dfa.is_accepting())
+            dfa.transition("e")
+            self.assertEqual(dfa.current_state, DFA.INVALID)
+
+    # Non-ASCII digits are numbers and end of input ends a number like any other character
+    def test_character_classes(self):
+        self.assertEqual(CharClass.classify("٣"), CharClass.NUMBER)
+        self.assertEqual(CharClass.classify("é"), CharClass.OTHER)
+        self.assertEqual(CharClass.classify(None), CharClass.OTHER)
+        self.assertEqual(DFA.TABLE[DFA.START_NUMBER][CharClass.classify(None)], DFA.END_NUMBER)
+        self.assertEqual(DFA.TABLE[DFA.START_STRING][CharClass.classify("\t")], DFA.INVALID)
+
+    def test_errors(self):
+        cases = {'[1, x]': (['<[>', '<num, 1.0>', '<,>'], "Invalid character 'x' at position 4"),
+                 '[nul]': (['<[>'], "Invalid character ']' at position 4"),
+                 '"a\tb"': ([], "Invalid character '\t' at position 2"),
+                 '"abc': ([], "Invalid character 'None' at position 4")}
+        for text, (tokens, error) in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(tokenize(text), (tokens, f"Lexical Error: {error}\n"))
+
+
+class FastModeTest(unittest.TestCase):
+    def test_matches_baseline(self):
+        for text, expected in zip(INPUTS, TOKENS):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                tokens = Lexer(text).tokenize(fast=True)
+            self.assertEqual("".join(f"{token}\n" for token in tokens), expected)
+
+    # Same tokens, and the same lexical error at the same position, as the DFA path
+    def test_matches_tokenize(self):
+        rng = random.Random(2)
+        for _ in range(500):
+            text = generate_text(rng)
+            with self.subTest(text=text):
+                self.assertEqual(tokenize(text, fast=True), tokenize(text))
+
+    # A string left open at the end of a long input is an error at the end of input
+    def test_long_strings(self):
+        blob = "QUJD" * 50000
+        text = f'{{"data": "{blob}", "more": ["{blob}'
+        tokens, output = tokenize(text, fast=True)
+        self.assertEqual((tokens, output), tokenize(text))
+        self.assertEqual(tokens[3], f"<str, {blob}>")
+        self.assertEqual(output, f"Lexical Error: Invalid character 'None' at position {len(text)}\n")
+
+
+class StreamingTest(unittest.TestCase):
+    # Lexes text with iter_tokens in the form tokenize() gives: the tokens before a lexical
+    # error and the error printed, or the text of another exception
+    def iter_tokens(self, text, chunk_size, as_bytes):
+        data = text.encode("utf-8") if as_bytes else text
+        file = io.BytesIO(data) if as_bytes else io.StringIO(data)
+        tokens = []
+        try:
+            for token in Lexer.iter_tokens(file, chunk_size):
+                tokens.append(repr(token))
+        except LexerError as e:
+            return tokens, f"Lexical Error: {e}\n"
+        except Exception as e:
+            return ("raised", str(e)), ""
+        return tokens, ""
+
+    def test_matches_baseline(self):
+        for text, expected in zip(INPUTS, TOKENS):
+            for chunk_size in (1, 7, 65536):
+                tokens = Lexer.iter_tokens(io.StringIO(text), chunk_size)
+                self.assertEqual("".join(f"{token}\n" for token in tokens), expected)
+
+    # Tokens and errors split across chunks of any size, or across UTF-8 sequences,
+    # come out as tokenize gives them, with positions in the whole input
+    def test_matches_tokenize(self):
+        rng = random.Random(3)
+        for _ in range(300):
+            text = generate_text(rng)
+            expected = tokenize(text, fast=True)
+            for chunk_size in (1, 2, 5, 64):
+                as_bytes = rng.random() < 0.5
+                with self.subTest(text=text, chunk_size=chunk_size, as_bytes=as_bytes):
+                    self.assertEqual(self.iter_tokens(text, chunk_size, as_bytes), expected)
+
+    # feed() hands back each token once it is complete and close() the rest
+    def test_feed(self):
+        stream = StreamLexer()
+        data = '{"key": 123, "é"}'.encode("utf-8")
+        self.assertEqual(list(map(repr, stream.feed(data[:4]))), ['<{>'])
+        self.assertEqual(list(map(repr, stream.feed(data[4:10]))), ['<str, key>', '<:>'])
+        self.assertEqual(list(map(repr, stream.feed(data[10:15]))), ['<num, 123.0>', '<,>'])
+        self.assertEqual(list(map(repr, stream.feed(data[15:]))), ['<str, é>'])
+        self.assertEqual(list(map(repr, stream.close())), ['<}>'])
+
+        stream = StreamLexer()
+        self.assertEqual(list(map(repr, stream.feed('[1, x'))), ['<[>', '<num, 1.0>', '<,>'])
+        with self.assertRaisesRegex(LexerError, "Invalid character 'x' at position 4"):
+            stream.feed(']')
+
+
+class ByteLexerTest(unittest.TestCase):
+    def tokenize(self, data):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tokens = list(map(repr, ByteLexer(data).tokenize()))
+        return tokens, output.getvalue()
+
+    def test_matches_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.txt")
+            for text, expected in zip(INPUTS, TOKENS):
+                with open(path, "w") as output_file:
+                    output_file.write(text)
+                with ByteLexer.open(path) as lexer:
+                    tokens = lexer.tokenize()
+                self.assertEqual("".join(f"{token}\n" for token in tokens), expected)
+                self.assertIsNone(lexer.mapped)
+
+    # On ASCII input byte offsets are character positions, so everything matches Lexer
+    def test_matches_tokenize(self):
+        rng = random.Random(14)
+        for _ in range(500):
+            text = generate_text(rng)
+            if not text.isascii():
+                continue
+            # numbers such as 1.2.5 raise ValueError from float(), with bytes in its text
+            expected = tokenize(text, fast=True)
+            if isinstance(expected[0], tuple):
+                continue
+            with self.subTest(text=text):
+                self.assertEqual(self.tokenize(text.encode("utf-8")), expected)
+                self.assertEqual(self.tokenize(memoryview(text.encode("utf-8"))), expected)
+
+    # Only string payloads are decoded; positions count bytes and only ASCII digits are numbers
+    def test_non_ascii(self):
+        self.assertEqual(self.tokenize('["é", "ü"]'.encode("utf-8")),
+                         (['<[>', '<str, é>', '<,>', '<str, ü>', '<]>'], ""))
+        self.assertEqual(self.tokenize('["é", x]'.encode("utf-8")),
+                         (['<[>', '<str, é>', '<,>'], "Lexical Error: Invalid character 'x' at position 7\n"))
+        self.assertEqual(self.tokenize('{"a": ٣}'.encode("utf-8")),
+                         (['<{>', '<str, a>', '<:>'], "Lexical Error: Invalid character '٣' at position 6\n"))
+        self.assertEqual(tokenize('{"a": ٣}'), (['<{>', '<str, a>', '<:>', '<num, 3.0>', '<}>'], ""))
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "empty.txt")
+            open(path, "w").close()
+            with ByteLexer.open(path) as lexer:
+                self.assertEqual(lexer.tokenize(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# Behavior tests for Stats: attached stats leave results unchanged, and the counters
+# agree with the tokens and errors of the same document.
+# Run from the repository root: python3 -m pytest tests
+import io
+import json
+import os
+import sys
+import unittest
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Parser import Parser, parse_json
+from Scanner import Lexer
+from Stats import Stats
+
+
+def read(path):
+    with open(os.path.join(ROOT, path)) as input_file:
+        return input_file.read()
+
+
+INPUTS = [read(f"tests/input{i}.txt") for i in range(5)]
+OUTPUTS = [read(f"outputs/output{i}.txt") for i in range(5)]
+INVALID = '{"a": [1, "x", 2], "a": {"": 1, "true": "null"}, "b": [01, 1.]}'
+
+
+def tree_text(tree):
+    output = io.StringIO()
+    tree.print_tree(file=output)
+    return output.getvalue()
+
+
+def attached(text):
+    stats = Stats()
+    parser = stats.attach_parser(Parser.from_lexer(stats.attach_lexer(Lexer(text))))
+    return stats, parser
+
+
+class StatsTest(unittest.TestCase):
+    def test_results_match_outputs(self):
+        for text, expected in zip(INPUTS, OUTPUTS):
+            stats, parser = attached(text)
+            self.assertEqual(tree_text(parser.parse()), expected)
+            self.assertEqual(parser.errors, [])
+
+    def test_token_counts(self):
+        for text in INPUTS + [INVALID]:
+            stats, parser = attached(text)
+            parser.parse()
+            tokens = Lexer(text).tokenize(fast=True)
+            with self.subTest(text=text):
+                self.assertEqual(stats.token_counts, dict(Counter(token.type for token in tokens)))
+                phases = stats.as_dict()["phases"]
+                # every token read is timed under the phase of its type
+                self.assertEqual(sum(phase["calls"] for name, phase in phases.items() if name.startswith("lex.")),
+                                 len(tokens))
+                self.assertEqual(stats.bytes_scanned, len(text))
+
+    def test_validators(self):
+        for lines in (None, [str(token) + "\n" for token in Lexer(INVALID).tokenize()]):
+            stats = Stats()
+            if lines is None:
+                parser = stats.attach_parser(Parser.from_lexer(stats.attach_lexer(Lexer(INVALID))))
+            else:
+                parser = stats.attach_parser(Parser(lines))
+            parser.parse()
+            validators = stats.as_dict()["validators"]
+            with self.subTest(text_format=lines is not None):
+                if lines is None:
+                    self.assertEqual(parser.errors, parse_json(INVALID)[1])
+                self.assertEqual(sum(validator["fired"] for validator in validators.values()), len(parser.errors))
+                runs = sum(validator["runs"] for validator in validators.values())
+                self.assertGreaterEqual(runs, len(parser.errors))
+
+    def test_json_lines(self):
+        stats, parser = attached(INPUTS[3])
+        parser.parse()
+        lines = [json.loads(line) for line in stats.json_lines(file="input3.txt")]
+        self.assertEqual(lines[0]["kind"], "document")
+        self.assertEqual(lines[0]["max_depth"], 3)
+        self.assertTrue(all(line["file"] == "input3.txt" for line in lines))
+        self.assertIn("lex.string", {line["name"] for line in lines if line["kind"] == "phase"})
+
+
+if __name__ == "__main__":
+    unittest.main()